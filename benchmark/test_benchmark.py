@@ -110,6 +110,18 @@ def test_sort(benchmark):
         flu(range(3000, 0, -1)).sort().collect()
 
 
+def test_merge_sorted(benchmark):
+    @benchmark
+    def work():
+        flu.merge_sorted(range(0, 3000, 3), range(1, 3000, 3), range(2, 3000, 3)).collect()
+
+
+def test_sample(benchmark):
+    @benchmark
+    def work():
+        flu(range(10000)).sample(10).collect()
+
+
 def test_shuffle(benchmark):
     original_order = list(range(10000))
 
@@ -118,6 +130,14 @@ def test_shuffle(benchmark):
         flu(original_order).shuffle().collect()
 
 
+def test_shuffle_buffer_size(benchmark):
+    original_order = list(range(10000))
+
+    @benchmark
+    def work():
+        flu(original_order).shuffle(buffer_size=100).collect()
+
+
 def test_map(benchmark):
     @benchmark
     def work():
@@ -210,6 +230,30 @@ def test_window(benchmark):
         gen = flu(range(5)).window(n=3, step=3).collect
 
 
+def test_rolling(benchmark):
+    @benchmark
+    def work():
+        gen = flu(range(1000)).rolling(n=100, agg="mean").collect()
+
+
+def test_map_cached(benchmark):
+    @benchmark
+    def work():
+        gen = flu(range(1000)).map_cached(lambda x: x * x, key=lambda x: x % 10).collect()
+
+
+def test_map_batched(benchmark):
+    @benchmark
+    def work():
+        gen = flu(range(1000)).map_batched(lambda xs: [x * x for x in xs], batch_size=100).collect()
+
+
+def test_map_resilient(benchmark):
+    @benchmark
+    def work():
+        gen = flu(range(1000)).map_resilient(lambda x: x * x, retries=2).collect()
+
+
 def test_flatten(benchmark):
     nested = [1, [2, (3, [4])], ["rbsd", "abc"], (7,)]
 
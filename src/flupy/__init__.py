@@ -1,9 +1,9 @@
 from importlib.metadata import version
 
 from flupy.cli.utils import walk_dirs, walk_files
-from flupy.fluent import flu
+from flupy.fluent import FluentCache, JoinIndex, LRUCache, TokenBucket, flu
 
 __project__ = "flupy"
 __version__ = version(__project__)
 
-__all__ = ["flu", "walk_files", "walk_dirs"]
+__all__ = ["flu", "walk_files", "walk_dirs", "FluentCache", "JoinIndex", "LRUCache", "TokenBucket"]
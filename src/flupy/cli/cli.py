@@ -1,15 +1,35 @@
 import argparse
 import importlib
+import locale
+import os
 import sys
+from contextlib import suppress
 from typing import Any, Dict, Generator, List, Optional
 
 from flupy import __version__, flu, walk_dirs, walk_files
+from flupy.fluent import read_offset, write_offset
 
 
-def read_file(path: str) -> Generator[str, None, None]:
-    """Yield lines from a file given its path"""
-    with open(path, "r") as f:
-        yield from f
+def read_file(path: str, state_path: Optional[str] = None, every: int = 1000) -> Generator[str, None, None]:
+    """Yield lines from a file given its path
+
+    When *state_path* is given, reading starts from the byte offset committed to it, and the offset of the
+    lines consumed so far is committed every *every* lines"""
+    if state_path is None:
+        with open(path, "r") as f:
+            yield from f
+        return
+
+    encoding = locale.getpreferredencoding(False)
+    offset = read_offset(state_path)
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for lineno, line in enumerate(f, 1):
+            yield line.decode(encoding)
+            offset += len(line)
+            if lineno % every == 0:
+                write_offset(state_path, offset)
+    write_offset(state_path, offset)
 
 
 def parse_args(args: List[str]) -> argparse.Namespace:
@@ -21,6 +41,13 @@ def parse_args(args: List[str]) -> argparse.Namespace:
     parser.add_argument("-v", "--version", action="version", version="%(prog)s " + __version__)
     parser.add_argument("command", help="command to execute against input")
     parser.add_argument("-f", "--file", help="path to input file")
+    parser.add_argument(
+        "-r",
+        "--resume",
+        metavar="STATE",
+        help="path to a state file recording progress through --file\n"
+        "An interrupted run resumes from the last committed offset",
+    )
     parser.add_argument(
         "-i",
         "--import",
@@ -34,7 +61,10 @@ def parse_args(args: List[str]) -> argparse.Namespace:
         "\t'from os import environ' = '-i os:environ'\n"
         "\t'from os import environ as env' = '-i os:environ:env'\n",
     )
-    return parser.parse_args(args)
+    parsed = parser.parse_args(args)
+    if parsed.resume and not parsed.file:
+        parser.error("--resume requires --file")
+    return parsed
 
 
 def build_import_dict(imps: List[str]) -> Dict[str, Any]:
@@ -63,7 +93,7 @@ def main(argv: Optional[List[str]] = None) -> None:
     import_dict = build_import_dict(_import)
 
     if _file:
-        _ = flu(read_file(_file)).map(str.rstrip)
+        _ = flu(read_file(_file, state_path=args.resume)).map(str.rstrip)
     else:
         try:
             # Restore the default SIGPIPE handler
@@ -93,3 +123,7 @@ def main(argv: Optional[List[str]] = None) -> None:
         pass
     else:
         sys.stdout.write(str(pipeline) + "\n")
+
+    if args.resume:
+        with suppress(FileNotFoundError):
+            os.remove(args.resume)
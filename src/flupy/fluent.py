@@ -1,15 +1,32 @@
 # pylint: disable=invalid-name
+import asyncio
+import hashlib
+import heapq
+import json
+import math
+import os
+import pickle
+import queue
+import re
+import sys
+import tempfile
+import threading
 import time
-from collections import defaultdict, deque
+import weakref
+from collections import OrderedDict, defaultdict, deque
 from collections.abc import Iterable as IterableType
-from functools import reduce
-from itertools import dropwhile, groupby, islice, product, takewhile, tee, zip_longest
-from random import sample
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import suppress
+from functools import partial, reduce
+from itertools import chain, dropwhile, groupby, islice, product, takewhile, tee, zip_longest
+from random import Random, randrange, sample, shuffle
 from typing import (
+    IO,
     Any,
     Callable,
     Collection,
     Concatenate,
+    Container,
     Deque,
     Dict,
     Generator,
@@ -18,9 +35,12 @@ from typing import (
     Iterable,
     Iterator,
     List,
+    Mapping,
+    NamedTuple,
     Optional,
     ParamSpec,
     Protocol,
+    Sequence,
     Set,
     Tuple,
     Type,
@@ -30,7 +50,7 @@ from typing import (
     overload,
 )
 
-__all__ = ["flu"]
+__all__ = ["flu", "FluentCache", "JoinIndex", "LRUCache", "TokenBucket"]
 
 
 T = TypeVar("T")
@@ -74,6 +94,785 @@ def identity(x: T) -> T:
     return x
 
 
+def read_offset(path: str) -> int:
+    """Return the offset committed to the state file at *path*, or 0 if there is none"""
+    try:
+        with open(path, "r") as f:
+            return int(json.load(f)["offset"])
+    except FileNotFoundError:
+        return 0
+
+
+def write_offset(path: str, offset: int) -> None:
+    """Atomically commit *offset* to the state file at *path*"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"offset": offset}, f)
+    os.replace(tmp_path, path)
+
+
+# Number of partitions each side of a join is split into when it spills to disk
+_SPILL_PARTITIONS = 32
+
+# Depth after which skewed partitions are joined in memory instead of being split again
+_SPILL_MAX_DEPTH = 3
+
+
+def _read_pickles(path: str) -> Generator[Any, None, None]:
+    """Yield each object pickled consecutively into the file at *path*"""
+    with open(path, "rb") as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+def _hash_join(
+    left: Iterable[Any],
+    right: Union[Iterable[Any], "JoinIndex[Any]"],
+    key: Callable[[Any], Hashable],
+    other_key: Callable[[Any], Hashable],
+    keep_left: bool,
+    keep_right: bool,
+    max_items: Optional[int] = None,
+    spill_dir: Optional[str] = None,
+    depth: int = 0,
+) -> Generator[Tuple[Any, Any], None, None]:
+    """Join two iterables by loading *right* into a hash table and probing it with each entry of *left*
+
+    Unmatched left entries are paired with None when *keep_left* and unmatched right entries are yielded
+    as (None, entry) after all left entries when *keep_right*
+
+    When *right* holds more than *max_items* entries, both sides are hash partitioned to temporary files
+    under *spill_dir* and joined one partition at a time. When *right* is a JoinIndex its lookup is probed directly
+    """
+    if isinstance(right, JoinIndex):
+        other_lookup: Mapping[Hashable, Sequence[Any]] = right._lookup
+    else:
+        other_lookup = built_lookup = defaultdict(list)
+
+        right_iter = iter(right)
+        for n_items, entry_other in enumerate(right_iter, start=1):
+            built_lookup[other_key(entry_other)].append(entry_other)
+            if max_items is not None and n_items > max_items and depth < _SPILL_MAX_DEPTH:
+
+                def spilled() -> Generator[Any, None, None]:
+                    yield from chain.from_iterable(built_lookup.values())
+                    built_lookup.clear()
+
+                yield from _grace_join(
+                    left,
+                    chain(spilled(), right_iter),
+                    key,
+                    other_key,
+                    keep_left,
+                    keep_right,
+                    max_items,
+                    spill_dir,
+                    depth,
+                )
+                return
+
+    matched_other_keys: Set[Hashable] = set()
+
+    for entry in left:
+        entry_key = key(entry)
+        matches: Optional[Sequence[Any]] = other_lookup.get(entry_key)
+
+        if matches:
+            if keep_right:
+                matched_other_keys.add(entry_key)
+            for match in matches:
+                yield (entry, match)
+        elif keep_left:
+            yield (entry, None)
+
+    if keep_right:
+        for other_key_val, entries_other in other_lookup.items():
+            if other_key_val not in matched_other_keys:
+                for entry_other in entries_other:
+                    yield (None, entry_other)
+
+
+def _grace_join(
+    left: Iterable[Any],
+    right: Iterable[Any],
+    key: Callable[[Any], Hashable],
+    other_key: Callable[[Any], Hashable],
+    keep_left: bool,
+    keep_right: bool,
+    max_items: int,
+    spill_dir: Optional[str],
+    depth: int,
+) -> Generator[Tuple[Any, Any], None, None]:
+    """Hash partition both sides of a join to temporary files and join each pair of partitions with _hash_join"""
+    with tempfile.TemporaryDirectory(dir=spill_dir) as tmp_dir:
+        right_paths = [os.path.join(tmp_dir, f"right-{i}") for i in range(_SPILL_PARTITIONS)]
+        left_paths = [os.path.join(tmp_dir, f"left-{i}") for i in range(_SPILL_PARTITIONS)]
+
+        for paths, entries, key_func in ((right_paths, right, other_key), (left_paths, left, key)):
+            files = [open(path, "wb") for path in paths]
+            try:
+                for entry in entries:
+                    # Salt with depth so a partition that is still too large splits differently
+                    partition = hash((depth, key_func(entry))) % _SPILL_PARTITIONS
+                    pickle.dump(entry, files[partition], pickle.HIGHEST_PROTOCOL)
+            finally:
+                for f in files:
+                    f.close()
+
+        for left_path, right_path in zip(left_paths, right_paths):
+            yield from _hash_join(
+                _read_pickles(left_path),
+                _read_pickles(right_path),
+                key,
+                other_key,
+                keep_left,
+                keep_right,
+                max_items,
+                spill_dir,
+                depth + 1,
+            )
+
+
+def _merge_join(
+    left: Iterable[Any],
+    right: Iterable[Any],
+    key: Callable[[Any], Any],
+    other_key: Callable[[Any], Any],
+    keep_left: bool,
+    keep_right: bool,
+) -> Generator[Tuple[Any, Any], None, None]:
+    """Join two iterables sorted ascending by *key* and *other_key* holding only one run of equal right keys in memory
+
+    Unmatched left entries are paired with None when *keep_left* and unmatched right entries are yielded
+    as (None, entry) in key order when *keep_right*
+    """
+    right_groups = groupby(right, other_key)
+
+    def next_run(prev_run: Optional[Tuple[Any, List[Any]]] = None) -> Optional[Tuple[Any, List[Any]]]:
+        for run_key, run in right_groups:
+            if prev_run is not None and run_key < prev_run[0]:
+                raise ValueError("other elements are not sorted by join key")
+            return run_key, list(run)
+        return None
+
+    right_run = next_run()
+    prev_left_key: Any = _EMPTY
+
+    for left_key, left_run in groupby(left, key):
+        if not isinstance(prev_left_key, Empty) and left_key < prev_left_key:
+            raise ValueError("flu elements are not sorted by join key")
+        prev_left_key = left_key
+
+        while right_run is not None and right_run[0] < left_key:
+            if keep_right:
+                for entry_other in right_run[1]:
+                    yield (None, entry_other)
+            right_run = next_run(right_run)
+
+        if right_run is not None and right_run[0] == left_key:
+            matches = right_run[1]
+            for entry in left_run:
+                for match in matches:
+                    yield (entry, match)
+            right_run = next_run(right_run)
+        elif keep_left:
+            for entry in left_run:
+                yield (entry, None)
+
+    if keep_right:
+        while right_run is not None:
+            for entry_other in right_run[1]:
+                yield (None, entry_other)
+            right_run = next_run(right_run)
+
+
+_MASK_64 = (1 << 64) - 1
+
+
+class _BloomFilter:
+    """Approximate set membership for *capacity* keys with a false positive probability of *error_rate*"""
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.count = 0
+        self.n_bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.n_hashes = max(1, round(self.n_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.n_bits + 7) // 8)
+
+    def _positions(self, key: Hashable) -> Generator[int, None, None]:
+        # Scramble hash(key) with the splitmix64 finalizer since builtin hashes of nearby ints are nearby
+        h = hash(key) & _MASK_64
+        h = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & _MASK_64
+        h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & _MASK_64
+        h ^= h >> 31
+        # Double hashing, deriving every probe from the two halves of the scrambled hash
+        h1 = h >> 32
+        h2 = (h & 0xFFFFFFFF) | 1
+        for i in range(self.n_hashes):
+            yield (h1 + i * h2) % self.n_bits
+
+    def add(self, key: Hashable) -> None:
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: Hashable) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class _ScalableBloomFilter:
+    """A Bloom filter that grows as keys are added while bounding the overall false positive probability"""
+
+    def __init__(self, error_rate: float, initial_capacity: int = 1024) -> None:
+        # Each new filter doubles in capacity with half the error rate so the compound rate stays below *error_rate*
+        self.filters = [_BloomFilter(initial_capacity, error_rate / 2)]
+
+    def add(self, key: Hashable) -> None:
+        current = self.filters[-1]
+        if current.count >= current.capacity:
+            current = _BloomFilter(current.capacity * 2, current.error_rate / 2)
+            self.filters.append(current)
+        current.add(key)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return any(key in f for f in self.filters)
+
+
+class CacheInfo(NamedTuple):
+    """Counters reported by LRUCache.cache_info"""
+
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: int
+    currsize: int
+
+
+class LRUCache(Generic[T]):
+    """A mapping holding at most *maxsize* entries, evicting the least recently used entry when full
+
+    Entries older than *ttl* seconds are treated as missing. Lookups are counted as hits or misses,
+    and cache_info reports those counts along with the number of entries evicted to make room
+
+    >>> cache = LRUCache(2)
+    >>> flu([1, 2, 1, 3, 1]).map_cached(lambda x: x * 10, cache=cache).to_list()
+    [10, 20, 10, 30, 10]
+    >>> cache.cache_info()
+    CacheInfo(hits=2, misses=3, evictions=1, maxsize=2, currsize=2)
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, T]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: S) -> Union[T, S]:
+        """The value cached for *key*, or *default* when it is missing or expired"""
+        try:
+            expires, value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        if self.ttl is not None and expires <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: T) -> None:
+        """Cache *value* for *key*, evicting the least recently used entry if the cache is full"""
+        if self.maxsize <= 0:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl is not None else math.inf
+        self._entries[key] = (expires, value)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def cache_info(self) -> CacheInfo:
+        """Hit, miss and eviction counts along with the current number of entries"""
+        return CacheInfo(self.hits, self.misses, self.evictions, self.maxsize, len(self._entries))
+
+
+class _BackgroundReader:
+    """Iterate each of *iterables* on a daemon thread, holding up to *buffer_size* unconsumed items per source,
+    so that a consumer can wait on whichever source produces next with a timeout
+    """
+
+    _ITEM, _DONE, _ERROR = range(3)
+
+    def __init__(self, iterables: Sequence[Iterable[Any]], buffer_size: int) -> None:
+        self._queue: "queue.Queue[Tuple[int, int, Any]]" = queue.Queue()
+        self._slots = [threading.Semaphore(buffer_size) for _ in iterables]
+        self._stopped = threading.Event()
+        self._running = len(iterables)
+        for source, iterable in enumerate(iterables):
+            threading.Thread(target=self._read, args=(source, iterable), daemon=True).start()
+
+    def _read(self, source: int, iterable: Iterable[Any]) -> None:
+        try:
+            for item in iterable:
+                while not self._slots[source].acquire(timeout=0.1):
+                    if self._stopped.is_set():
+                        return
+                self._queue.put((self._ITEM, source, item))
+        except BaseException as exc:
+            self._queue.put((self._ERROR, source, exc))
+        else:
+            self._queue.put((self._DONE, source, None))
+
+    def get(self, timeout: Optional[float] = None) -> Union[Tuple[int, Any], Empty]:
+        """Return the next (source index, item), or _EMPTY once every source is exhausted
+
+        Raises queue.Empty when no item arrives within *timeout* seconds, and re-raises errors from sources
+        """
+        while self._running:
+            kind, source, item = self._queue.get(timeout=timeout)
+            if kind == self._ITEM:
+                self._slots[source].release()
+                return source, item
+            self._running -= 1
+            if kind == self._ERROR:
+                self.close()
+                raise item
+        return _EMPTY
+
+    def close(self) -> None:
+        """Stop reading sources, releasing threads blocked on full buffers"""
+        self._stopped.set()
+
+
+class _sourcemethod:
+    """Expose *func*, which takes iterables as positional arguments, both as a constructor on the class,
+    flu.func(a, b), and as a method on instances, flu(a).func(b), where the instance is the first iterable
+    """
+
+    def __init__(self, func: Callable[..., "Fluent[Any]"]) -> None:
+        self.func = func
+        self.__doc__ = func.__doc__
+        self.__wrapped__ = func
+
+    def __get__(self, obj: Optional["Fluent[Any]"], objtype: Optional[type] = None) -> Callable[..., "Fluent[Any]"]:
+        if obj is None:
+            return self.func
+        return partial(self.func, obj)
+
+
+class _SpillQueue:
+    """A FIFO queue holding up to *max_items* items in memory, pickling any further items to a temporary
+    file under *spill_dir* until the queue drains
+    """
+
+    def __init__(self, max_items: Optional[int] = None, spill_dir: Optional[str] = None) -> None:
+        self.max_items = max_items
+        self.spill_dir = spill_dir
+        self._memory: Deque[Any] = deque()
+        self._file: Optional[IO[bytes]] = None
+        self._n_spilled = 0
+        self._read_pos = 0
+        self._write_pos = 0
+
+    def __len__(self) -> int:
+        return len(self._memory) + self._n_spilled
+
+    def append(self, item: Any) -> None:
+        # Once items have spilled, later items must follow them to the file to keep FIFO order
+        if not self._n_spilled and (self.max_items is None or len(self._memory) < self.max_items):
+            self._memory.append(item)
+            return
+        if self._file is None:
+            self._file = tempfile.TemporaryFile(dir=self.spill_dir)
+        self._file.seek(self._write_pos)
+        pickle.dump(item, self._file, pickle.HIGHEST_PROTOCOL)
+        self._write_pos = self._file.tell()
+        self._n_spilled += 1
+
+    def popleft(self) -> Any:
+        if not self._memory and self._n_spilled and self._file is not None:
+            # Reload the oldest spilled items in bulk
+            self._file.seek(self._read_pos)
+            for _ in range(min(self._n_spilled, self.max_items or 1)):
+                self._memory.append(pickle.load(self._file))
+                self._n_spilled -= 1
+            self._read_pos = self._file.tell()
+            if not self._n_spilled:
+                self._file.seek(0)
+                self._file.truncate()
+                self._read_pos = self._write_pos = 0
+        return self._memory.popleft()
+
+    def clear(self) -> None:
+        self._memory.clear()
+        self._n_spilled = 0
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._read_pos = self._write_pos = 0
+
+
+def _timed_call(func: Callable[[T], _T1], val: T) -> Tuple[float, _T1]:
+    start = time.monotonic()
+    result = func(val)
+    return time.monotonic() - start, result
+
+
+class _ResilientCall(Generic[T, _T1]):
+    """The attempts of flu.map_resilient to compute func(val) for one element
+
+    Each attempt runs func on *pool*, optionally joined by a hedged duplicate, and fails once all of its calls
+    raised or *timeout* seconds pass. Failed attempts are retried after an exponential backoff
+    """
+
+    def __init__(self, val: T, func: Callable[[T], _T1], pool: ThreadPoolExecutor, now: float) -> None:
+        self.val = val
+        self.func = func
+        self.pool = pool
+        self.tries = 0
+        self.started = now
+        self.futures: List["Future[Tuple[float, _T1]]"] = []
+        self.retry_at: Optional[float] = None
+        self.done = False
+        self.result: Union[_T1, Empty] = _EMPTY
+        self.error: Optional[BaseException] = None
+        self._start(now)
+
+    def _start(self, now: float) -> None:
+        self.tries += 1
+        self.started = now
+        self.retry_at = None
+        self.futures = [self.pool.submit(_timed_call, self.func, self.val)]
+
+    def poll(
+        self,
+        now: float,
+        timeout: Optional[float],
+        retries: int,
+        backoff: float,
+        hedge_delay: Optional[float],
+        latencies: Deque[float],
+    ) -> float:
+        """Advance the call to time *now*, returning the next time it needs to be polled"""
+        if self.done:
+            return math.inf
+        if self.retry_at is not None:
+            if now < self.retry_at:
+                return self.retry_at
+            self._start(now)
+
+        for future in self.futures:
+            if future.done() and future.exception() is None:
+                latency, self.result = future.result()
+                latencies.append(latency)
+                self.done = True
+                return math.inf
+
+        timed_out = timeout is not None and now >= self.started + timeout
+        if timed_out or all(future.done() for future in self.futures):
+            for future in self.futures:
+                future.cancel()
+            if timed_out:
+                self.error = TimeoutError(f"call did not complete within {timeout} seconds")
+            else:
+                self.error = self.futures[-1].exception()
+            self.futures = []
+            if self.tries > retries:
+                self.done = True
+                return math.inf
+            self.retry_at = now + backoff * 2 ** (self.tries - 1)
+            return self.retry_at
+
+        wake_at = self.started + timeout if timeout is not None else math.inf
+        if hedge_delay is not None and len(self.futures) == 1:
+            if now >= self.started + hedge_delay:
+                self.futures.append(self.pool.submit(_timed_call, self.func, self.val))
+            else:
+                wake_at = min(wake_at, self.started + hedge_delay)
+        return wake_at
+
+
+class _Fanout:
+    """Distribute each element of *iterable* to the branches listed by *route*, each of which can be
+    consumed independently
+
+    Branches lagging behind buffer the elements they have not consumed yet. Once a branch holds *max_buffer*
+    elements, a branch that needs to read further either waits for it to catch up when *on_full* is "block",
+    which requires consuming branches from different threads, or the lagging branch spills elements to
+    temporary files under *spill_dir* when *on_full* is "spill"
+    """
+
+    def __init__(
+        self,
+        iterable: Iterable[Any],
+        n: int,
+        route: Callable[[Any], Iterable[int]],
+        max_buffer: Optional[int] = None,
+        on_full: str = "block",
+        spill_dir: Optional[str] = None,
+    ) -> None:
+        if on_full not in ("block", "spill"):
+            raise ValueError("on_full must be one of 'block' or 'spill'")
+        if max_buffer is not None and max_buffer < 1:
+            raise ValueError("max_buffer must be >= 1")
+        self._iterator = iter(iterable)
+        self._route = route
+        self._max_buffer = max_buffer
+        self._blocking = max_buffer is not None and on_full == "block"
+        self._queues = [_SpillQueue(None if self._blocking else max_buffer, spill_dir) for _ in range(n)]
+        self._open = [True] * n
+        self._exhausted = False
+        self._error: Optional[Exception] = None
+        self._cond = threading.Condition()
+
+    def _must_wait(self, i: int) -> bool:
+        return self._blocking and any(
+            self._open[j] and len(q) >= cast(int, self._max_buffer) for j, q in enumerate(self._queues) if j != i
+        )
+
+    def branch(self, i: int) -> "_FanoutBranch":
+        """An iterator over the elements routed to branch *i*"""
+        return _FanoutBranch(self, i)
+
+    def _next(self, i: int) -> Any:
+        own_queue = self._queues[i]
+        with self._cond:
+            while not own_queue:
+                # An error from the iterable is raised in every branch once it has consumed its buffer
+                if self._error is not None:
+                    raise self._error
+                if self._exhausted:
+                    raise StopIteration
+                if self._must_wait(i):
+                    self._cond.wait()
+                    continue
+                try:
+                    val = next(self._iterator)
+                except StopIteration:
+                    self._exhausted = True
+                    self._cond.notify_all()
+                    raise
+                except Exception as exc:
+                    self._error = exc
+                    self._cond.notify_all()
+                    raise
+                for j in self._route(val):
+                    if self._open[j]:
+                        self._queues[j].append(val)
+            val = own_queue.popleft()
+            self._cond.notify_all()
+        return val
+
+    def _close(self, i: int) -> None:
+        # An abandoned branch no longer buffers elements or holds back the others
+        with self._cond:
+            self._open[i] = False
+            self._queues[i].clear()
+            self._cond.notify_all()
+
+
+class _FanoutBranch:
+    """An iterator over one branch of a _Fanout, which closes the branch once it is exhausted or garbage
+    collected, including when it was never started
+    """
+
+    def __init__(self, fanout: _Fanout, i: int) -> None:
+        self._fanout = fanout
+        self._i = i
+        self._close = weakref.finalize(self, fanout._close, i)
+
+    def __iter__(self) -> "_FanoutBranch":
+        return self
+
+    def __next__(self) -> Any:
+        try:
+            return self._fanout._next(self._i)
+        except StopIteration:
+            self._close()
+            raise
+
+
+def _remove_spill_file(path: str, file: IO[bytes]) -> None:
+    file.close()
+    with suppress(FileNotFoundError):
+        os.remove(path)
+
+
+class FluentCache(Generic[T]):
+    """A cache of the elements of a flu, built with flu.cache, that can be iterated any number of times
+
+    Elements are read from the source lazily as the first iterator reaches them, and iterators running
+    concurrently on different threads share that single read. After *max_items* elements, further
+    elements are pickled to a temporary file under *spill_dir*, which is removed when the cache is closed
+    or garbage collected
+
+    >>> squares = flu(range(4)).map(lambda x: x * x).cache()
+    >>> flu(squares).sum()
+    14
+    >>> flu(squares).to_list()
+    [0, 1, 4, 9]
+    """
+
+    def __init__(self, iterable: Iterable[T], max_items: Optional[int] = None, spill_dir: Optional[str] = None) -> None:
+        self._source = iter(iterable)
+        self._max_items = max_items
+        self._spill_dir = spill_dir
+        self._memory: List[T] = []
+        # Offsets of spilled elements in the spill file
+        self._offsets: List[int] = []
+        self._spill_path: Optional[str] = None
+        self._spill_file: Optional[IO[bytes]] = None
+        self._finalizer: "Optional[weakref.finalize[[str, IO[bytes]], FluentCache[T]]]" = None
+        self._complete = False
+        self._lock = threading.Lock()
+
+    def _spill(self, val: T) -> None:
+        if self._spill_file is None:
+            fd, self._spill_path = tempfile.mkstemp(dir=self._spill_dir)
+            self._spill_file = os.fdopen(fd, "wb")
+            self._finalizer = weakref.finalize(self, _remove_spill_file, self._spill_path, self._spill_file)
+        offset = self._spill_file.tell()
+        pickle.dump(val, self._spill_file, pickle.HIGHEST_PROTOCOL)
+        # Flush before publishing the offset so readers never see a partial element
+        self._spill_file.flush()
+        self._offsets.append(offset)
+
+    def _fill(self, i: int) -> bool:
+        """Read from the source until element *i* is cached, returning False if the source ends first"""
+        with self._lock:
+            while len(self._memory) + len(self._offsets) <= i and not self._complete:
+                try:
+                    val = next(self._source)
+                except StopIteration:
+                    self._complete = True
+                    break
+                if self._max_items is None or len(self._memory) < self._max_items:
+                    self._memory.append(val)
+                else:
+                    self._spill(val)
+            return i < len(self._memory) + len(self._offsets)
+
+    def __iter__(self) -> "Fluent[T]":
+        def _impl() -> Generator[T, None, None]:
+            reader: Optional[IO[bytes]] = None
+            i = 0
+            try:
+                while i < len(self._memory) + len(self._offsets) or self._fill(i):
+                    if i < len(self._memory):
+                        yield self._memory[i]
+                    else:
+                        if reader is None:
+                            reader = open(cast(str, self._spill_path), "rb")
+                        reader.seek(self._offsets[i - len(self._memory)])
+                        yield pickle.load(reader)
+                    i += 1
+            finally:
+                if reader is not None:
+                    reader.close()
+
+        return Fluent(_impl())
+
+    def close(self) -> None:
+        """Remove the spill file, if any. The cache must not be iterated afterwards"""
+        if self._finalizer is not None:
+            self._finalizer()
+
+
+class JoinIndex(Generic[T]):
+    """A read-only lookup from join keys to entries, built once with flu.to_index and reusable by
+    join_left, join_inner, join_full in place of *other*
+
+    The index is never modified after it is built, so it can be shared between threads
+
+    >>> index = flu(range(0, 6, 2)).to_index()
+    >>> flu(range(4)).join_inner(index).to_list()
+    [(0, 0), (2, 2)]
+    >>> flu(range(3, 6)).join_left(index).to_list()
+    [(3, None), (4, 4), (5, None)]
+    """
+
+    def __init__(self, lookup: Mapping[Hashable, Sequence[T]]) -> None:
+        self._lookup: Dict[Hashable, Tuple[T, ...]] = {k: tuple(v) for k, v in lookup.items()}
+
+    def __len__(self) -> int:
+        return len(self._lookup)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._lookup
+
+    def get(self, key: Hashable) -> Tuple[T, ...]:
+        """Entries matching *key*, or an empty tuple when there are none
+
+        >>> flu(['a', 'bb', 'cc']).to_index(key=len).get(2)
+        ('bb', 'cc')
+        """
+        return self._lookup.get(key, ())
+
+    def save(self, path: str) -> None:
+        """Persist the index to the file at *path* for reloading with JoinIndex.load"""
+        with open(path, "wb") as f:
+            pickle.dump(self._lookup, f, pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path: str) -> "JoinIndex[Any]":
+        """Load an index previously persisted with JoinIndex.save"""
+        with open(path, "rb") as f:
+            return cls(pickle.load(f))
+
+
+class TokenBucket:
+    """A rate limiter refilling *rate* tokens per second, up to a capacity of *burst* tokens, that can be shared
+    by flu.rate_limit across pipelines and threads to hold them all to one budget
+
+    Tokens are handed out in the order they are requested, measured on a monotonic clock. The bucket starts
+    full, so the first *burst* tokens are available immediately
+
+    >>> bucket = TokenBucket(rate=100, burst=10)
+    >>> flu(range(3)).rate_limit(bucket).to_list()
+    [0, 1, 2]
+    >>> flu(range(3, 6)).rate_limit(bucket).to_list()
+    [3, 4, 5]
+    """
+
+    def __init__(self, rate: float, burst: float = 1) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be > 0")
+        if burst < 1:
+            raise ValueError("burst must be >= 1")
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: float) -> float:
+        """Take *tokens* from the bucket, returning how many seconds to wait until they are available"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._tokens + (now - self._updated) * self.rate, self.burst) - tokens
+            self._updated = now
+            return max(-self._tokens / self.rate, 0.0)
+
+    def acquire(self, tokens: float = 1) -> None:
+        """Block until *tokens* are available and take them"""
+        time.sleep(self._reserve(tokens))
+
+    async def acquire_async(self, tokens: float = 1) -> None:
+        """Wait without blocking the event loop until *tokens* are available and take them"""
+        await asyncio.sleep(self._reserve(tokens))
+
+
 class Fluent(Generic[T]):
     """A fluent interface to lazy generator functions
 
@@ -92,6 +891,22 @@ class Fluent(Generic[T]):
     def __init__(self, iterable: Iterable[T]) -> None:
         iterator = iter(iterable)
         self._iterator: Iterator[T] = iterator
+        # (key, reverse) the elements are known to be ordered by, if any
+        self._sorted_by: Optional[Tuple[Callable[[Any], Any], bool]] = None
+
+    def _keep_order(self, iterable: Iterable[S]) -> "Fluent[S]":
+        """Wrap *iterable*, an order preserving stage over self, carrying over known sortedness"""
+        fluent = Fluent(iterable)
+        fluent._sorted_by = self._sorted_by
+        return fluent
+
+    def _is_sorted_by(self, key: Callable[[Any], Any], reverse: Optional[bool] = None) -> bool:
+        """True when the elements are known to be ordered by *key*, in the *reverse* direction or either
+        direction when *reverse* is None
+        """
+        if self._sorted_by is None or self._sorted_by[0] is not key:
+            return False
+        return reverse is None or self._sorted_by[1] == reverse
 
     @overload
     def __getitem__(self, index: int) -> T:
@@ -108,7 +923,7 @@ class Fluent(Generic[T]):
             except StopIteration:
                 raise IndexError("flu index out of range")
         elif isinstance(key, slice):
-            return flu(islice(self._iterator, key.start, key.stop, key.step))
+            return self._keep_order(islice(self._iterator, key.start, key.stop, key.step))
         else:
             raise TypeError(f"Indices must be non-negative integers or slices, not {type(key).__name__}")
 
@@ -268,6 +1083,66 @@ class Fluent(Generic[T]):
             pass
         return container_type([x for x in val if not isinstance(x, Empty)])
 
+    def broadcast(self, *sinks: Callable[["Fluent[T]"], Any], buffer_size: int = 1024) -> Tuple[Any, ...]:
+        """Feed every element of the iterable to each of *sinks* in a single pass and return their results
+
+        Each sink is a function taking a flu of the elements, such as ``lambda f: f.filter(...).count()``,
+        and runs on its own thread. Elements are passed to sinks in lists of *buffer_size*, with at most
+        two lists waiting per sink, so memory stays bounded however far apart the sinks progress.
+        Iteration stops early once every sink has returned, and errors raised by sinks are re-raised
+
+        >>> flu(range(10)).broadcast(lambda f: f.sum(), lambda f: f.filter(lambda x: x % 2).count(), lambda f: f.max())
+        (45, 5, 9)
+        """
+        if buffer_size < 1:
+            raise ValueError("buffer_size must be >= 1")
+        feeds: List["queue.Queue[Optional[List[T]]]"] = [queue.Queue(maxsize=2) for _ in sinks]
+        finished = [threading.Event() for _ in sinks]
+        results: List[Any] = [None] * len(sinks)
+        errors: List[BaseException] = []
+
+        def run(i: int) -> None:
+            def elements() -> Generator[T, None, None]:
+                while True:
+                    vals = feeds[i].get()
+                    if vals is None:
+                        return
+                    yield from vals
+
+            try:
+                results[i] = sinks[i](Fluent(elements()))
+            except BaseException as exc:
+                errors.append(exc)
+            finally:
+                finished[i].set()
+
+        def feed(i: int, vals: Optional[List[T]]) -> None:
+            while not finished[i].is_set():
+                try:
+                    feeds[i].put(vals, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
+
+        threads = [threading.Thread(target=run, args=(i,), daemon=True) for i in range(len(sinks))]
+        for thread in threads:
+            thread.start()
+        try:
+            for vals in self.chunk(buffer_size):
+                if errors or all(event.is_set() for event in finished):
+                    break
+                for i in range(len(sinks)):
+                    feed(i, vals)
+        finally:
+            for i in range(len(sinks)):
+                feed(i, None)
+            for thread in threads:
+                thread.join()
+
+        if errors:
+            raise errors[0]
+        return tuple(results)
+
     ### End Summary ###
 
     ### Non-Constant Memory ###
@@ -304,14 +1179,114 @@ class Fluent(Generic[T]):
         [1, 3, -6]
         """
         if key is None:
-            return Fluent(sorted(cast("Fluent[Any]", self), reverse=reverse))
-        return Fluent(sorted(self, key=key, reverse=reverse))
+            fluent: Fluent[Any] = Fluent(sorted(cast("Fluent[Any]", self), reverse=reverse))
+        else:
+            fluent = Fluent(sorted(self, key=key, reverse=reverse))
+        fluent._sorted_by = (identity if key is None else key, reverse)
+        return fluent
+
+    def assume_sorted(
+        self, key: Optional[Callable[[T], Any]] = None, reverse: bool = False, check: bool = False
+    ) -> "Fluent[T]":
+        """Declare that the iterable is already ordered by *key* function if provided or identity otherwise
+
+        Order preserving stages carry the declaration forward so that downstream operators, like
+        group_by and unique, can use streaming algorithms instead of sorting or tracking every key.
+        Keys are matched by identity, so downstream operators must be given the same function object,
+        not an equivalent lambda. Set *check* to True to raise a ValueError when an element is found out of order
+
+        >>> flu([1, 1, 2, 3, 3]).assume_sorted().unique().to_list()
+        [1, 2, 3]
+
+        >>> flu([3, 1]).assume_sorted(check=True).to_list()
+        Traceback (most recent call last):
+        ...
+        ValueError: flu elements are not sorted
+        """
+        key_func: Callable[[T], Any] = identity if key is None else key
+
+        def _impl() -> Generator[T, None, None]:
+            prev: Any = _EMPTY
+            for val in self:
+                val_key = key_func(val)
+                if not isinstance(prev, Empty) and (prev < val_key if reverse else val_key < prev):
+                    raise ValueError("flu elements are not sorted")
+                prev = val_key
+                yield val
+
+        fluent = Fluent(_impl() if check else self._iterator)
+        fluent._sorted_by = (key_func, reverse)
+        return fluent
+
+    def _merge_joinable(self, other: Iterable[Any], key: Callable[[Any], Any], other_key: Callable[[Any], Any]) -> bool:
+        """True when self and *other* are both known to be sorted ascending by their join keys"""
+        return isinstance(other, Fluent) and self._sorted_by == (key, False) and other._sorted_by == (other_key, False)
+
+    @_sourcemethod
+    def merge_sorted(
+        *iterables: Iterable[Any], key: Optional[Callable[[Any], Any]] = None, reverse: bool = False
+    ) -> "Fluent[Any]":
+        """Lazily merge iterables that are each sorted by *key* function if provided or identity otherwise
+        into a single sorted iterable
+
+        Only the next element of each iterable is held in memory. Can be called on the class with all
+        iterables or on an instance to merge it with the others. The result is known to be sorted, see assume_sorted
+
+        >>> flu.merge_sorted([1, 4, 7], [2, 5], [3, 6]).to_list()
+        [1, 2, 3, 4, 5, 6, 7]
+
+        >>> flu([5, 1]).merge_sorted([4, 2], reverse=True).to_list()
+        [5, 4, 2, 1]
+        """
+        fluent: Fluent[Any] = Fluent(heapq.merge(*iterables, key=key, reverse=reverse))
+        fluent._sorted_by = (identity if key is None else key, reverse)
+        return fluent
+
+    @_sourcemethod
+    def interleave(*iterables: Iterable[Any], concurrent: bool = True, buffer_size: int = 64) -> "Fluent[Any]":
+        """Yield elements from several iterables as soon as any of them produces one
+
+        Each iterable is read on its own background thread holding up to *buffer_size* unconsumed elements,
+        so one slow or blocking source, like a pipe or socket, does not stall the others.
+        Set *concurrent* to False to instead take one element from each iterable in turn on the calling thread.
+        Can be called on the class with all iterables or on an instance to interleave it with the others
+
+        >>> flu.interleave([1, 2, 3], ['a', 'b'], concurrent=False).to_list()
+        [1, 'a', 2, 'b', 3]
+        """
+
+        def _impl_round_robin() -> Generator[Any, None, None]:
+            iterators = deque(iter(iterable) for iterable in iterables)
+            while iterators:
+                iterator = iterators.popleft()
+                for val in iterator:
+                    yield val
+                    iterators.append(iterator)
+                    break
+
+        def _impl() -> Generator[Any, None, None]:
+            if buffer_size < 1:
+                raise ValueError("buffer_size must be >= 1")
+            reader = _BackgroundReader(iterables, buffer_size)
+            try:
+                while True:
+                    received = reader.get()
+                    if isinstance(received, Empty):
+                        return
+                    yield received[1]
+            finally:
+                reader.close()
+
+        return Fluent(_impl() if concurrent else _impl_round_robin())
 
     def join_left(
         self,
-        other: Iterable[_T1],
+        other: Union[Iterable[_T1], JoinIndex[_T1]],
         key: Callable[[T], Hashable] = identity,
         other_key: Callable[[_T1], Hashable] = identity,
+        sorted: bool = False,
+        max_items: Optional[int] = None,
+        spill_dir: Optional[str] = None,
     ) -> "Fluent[Tuple[T, Union[_T1, None]]]":
         """Join the iterable with another iterable using equality between *key* applied to self and *other_key* applied to *other* to identify matching entries
 
@@ -319,33 +1294,37 @@ class Fluent(Generic[T]):
 
         Note: join_left loads *other* into memory
 
-        >>> flu(range(6)).join_left(range(0, 6, 2)).to_list()
-        [(0, 0), (1, None), (2, 2), (3, None), (4, 4), (5, None)]
-        """
+        When both iterables are sorted ascending by their join keys, setting *sorted* to True performs a
+        merge join that streams both sides and only holds a run of entries from *other* sharing a key in memory.
+        The merge join is used automatically when both sides are known to be ordered by their keys, see assume_sorted
 
-        def _impl() -> Generator[Tuple[T, Union[_T1, None]], None, None]:
-
-            other_lookup = defaultdict(list)
-
-            for entry_other in other:
-                other_lookup[other_key(entry_other)].append(entry_other)
+        When *other* holds more than *max_items* entries, both iterables are pickled into hash partitioned temporary
+        files under *spill_dir* and joined one partition at a time. Results are then grouped by partition
 
-            for entry in self:
-                matches: Optional[List[_T1]] = other_lookup.get(key(entry))
+        *other* may also be a JoinIndex built with to_index, which skips building the lookup and ignores *other_key*
 
-                if matches:
-                    for match in matches:
-                        yield (entry, match)
-                else:
-                    yield (entry, None)
+        >>> flu(range(6)).join_left(range(0, 6, 2)).to_list()
+        [(0, 0), (1, None), (2, 2), (3, None), (4, 4), (5, None)]
 
-        return Fluent(_impl())
+        >>> flu(range(6)).join_left(range(0, 6, 2), sorted=True).to_list()
+        [(0, 0), (1, None), (2, 2), (3, None), (4, 4), (5, None)]
+        """
+        if not isinstance(other, JoinIndex) and (sorted or self._merge_joinable(other, key, other_key)):
+            return Fluent(_merge_join(self, other, key, other_key, keep_left=True, keep_right=False))
+        return Fluent(
+            _hash_join(
+                self, other, key, other_key, keep_left=True, keep_right=False, max_items=max_items, spill_dir=spill_dir
+            )
+        )
 
     def join_inner(
         self,
-        other: Iterable[_T1],
+        other: Union[Iterable[_T1], JoinIndex[_T1]],
         key: Callable[[T], Hashable] = identity,
         other_key: Callable[[_T1], Hashable] = identity,
+        sorted: bool = False,
+        max_items: Optional[int] = None,
+        spill_dir: Optional[str] = None,
     ) -> "Fluent[Tuple[T, _T1]]":
         """Join the iterable with another iterable using equality between *key* applied to self and *other_key* applied to *other* to identify matching entries
 
@@ -353,31 +1332,37 @@ class Fluent(Generic[T]):
 
         Note: join_inner loads *other* into memory
 
-        >>> flu(range(6)).join_inner(range(0, 6, 2)).to_list()
-        [(0, 0), (2, 2), (4, 4)]
-
-        """
-
-        def _impl() -> Generator[Tuple[T, _T1], None, None]:
-
-            other_lookup = defaultdict(list)
+        When both iterables are sorted ascending by their join keys, setting *sorted* to True performs a
+        merge join that streams both sides and only holds a run of entries from *other* sharing a key in memory.
+        The merge join is used automatically when both sides are known to be ordered by their keys, see assume_sorted
 
-            for entry_other in other:
-                other_lookup[other_key(entry_other)].append(entry_other)
+        When *other* holds more than *max_items* entries, both iterables are pickled into hash partitioned temporary
+        files under *spill_dir* and joined one partition at a time. Results are then grouped by partition
 
-            for entry in self:
-                matches: List[_T1] = other_lookup[key(entry)]
+        *other* may also be a JoinIndex built with to_index, which skips building the lookup and ignores *other_key*
 
-                for match in matches:
-                    yield (entry, match)
+        >>> flu(range(6)).join_inner(range(0, 6, 2)).to_list()
+        [(0, 0), (2, 2), (4, 4)]
 
-        return Fluent(_impl())
+        >>> flu(range(6)).join_inner(range(0, 6, 2), sorted=True).to_list()
+        [(0, 0), (2, 2), (4, 4)]
+        """
+        if not isinstance(other, JoinIndex) and (sorted or self._merge_joinable(other, key, other_key)):
+            return Fluent(_merge_join(self, other, key, other_key, keep_left=False, keep_right=False))
+        return Fluent(
+            _hash_join(
+                self, other, key, other_key, keep_left=False, keep_right=False, max_items=max_items, spill_dir=spill_dir
+            )
+        )
 
     def join_full(
         self,
-        other: Iterable[_T1],
+        other: Union[Iterable[_T1], JoinIndex[_T1]],
         key: Callable[[T], Hashable] = identity,
         other_key: Callable[[_T1], Hashable] = identity,
+        sorted: bool = False,
+        max_items: Optional[int] = None,
+        spill_dir: Optional[str] = None,
     ) -> "Fluent[Tuple[Union[T, None], Union[_T1, None]]]":
         """Join the iterable with another iterable using equality between *key* applied to self and *other_key* applied to *other* to identify matching entries
 
@@ -385,54 +1370,478 @@ class Fluent(Generic[T]):
 
         Note: join_full loads both *self* and *other* into memory
 
+        When both iterables are sorted ascending by their join keys, setting *sorted* to True performs a
+        merge join that streams both sides and only holds a run of entries from *other* sharing a key in memory.
+        Unmatched entries from *other* are then yielded in key order rather than after all entries of the iterable
+
+        When *other* holds more than *max_items* entries, both iterables are pickled into hash partitioned temporary
+        files under *spill_dir* and joined one partition at a time. Results are then grouped by partition
+
+        *other* may also be a JoinIndex built with to_index, which skips building the lookup and ignores *other_key*
+
         >>> flu(range(4)).join_full(range(2, 6)).to_list()
         [(0, None), (1, None), (2, 2), (3, 3), (None, 4), (None, 5)]
+
+        >>> flu([0, 3]).join_full([1, 3], sorted=True).to_list()
+        [(0, None), (None, 1), (3, 3)]
         """
+        if sorted and not isinstance(other, JoinIndex):
+            return Fluent(_merge_join(self, other, key, other_key, keep_left=True, keep_right=True))
+        return Fluent(
+            _hash_join(
+                self, other, key, other_key, keep_left=True, keep_right=True, max_items=max_items, spill_dir=spill_dir
+            )
+        )
 
-        def _impl() -> Generator[Tuple[Union[T, None], Union[_T1, None]], None, None]:
+    def _key_set(
+        self,
+        other: Union[Iterable[_T1], JoinIndex[_T1]],
+        other_key: Callable[[_T1], Hashable],
+        error_rate: Optional[float],
+    ) -> Container[Hashable]:
+        """Collect the keys of *other* into a set, or a Bloom filter when *error_rate* is provided"""
+        if isinstance(other, JoinIndex):
+            return other._lookup.keys()
+        if error_rate is None:
+            return {other_key(entry_other) for entry_other in other}
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1")
+        bloom = _ScalableBloomFilter(error_rate)
+        for entry_other in other:
+            bloom.add(other_key(entry_other))
+        return bloom
+
+    def filter_in(
+        self,
+        other: Union[Iterable[_T1], JoinIndex[_T1]],
+        key: Callable[[T], Hashable] = identity,
+        other_key: Callable[[_T1], Hashable] = identity,
+        error_rate: Optional[float] = None,
+    ) -> "Fluent[T]":
+        """Yield elements of the iterable where *key* matches *other_key* applied to some entry of *other*
 
-            # Build lookup for other
-            other_lookup: Dict[Hashable, List[_T1]] = defaultdict(list)
-            other_keys_seen: Set[Hashable] = set()
+        Only the keys of *other* are held in memory, and each element is yielded at most once however many
+        entries of *other* match it. Setting *error_rate* stores the keys in a Bloom filter instead of a set,
+        which uses far less memory but lets through non-matching elements with probability *error_rate*
 
-            for entry_other in other:
-                other_key_val = other_key(entry_other)
-                other_lookup[other_key_val].append(entry_other)
-                other_keys_seen.add(other_key_val)
+        Note: filter_in loads the keys of *other* into memory
 
-            # Track which keys from other have been matched
-            matched_other_keys: Set[Hashable] = set()
+        >>> flu(range(6)).filter_in([0, 2, 2, 4]).to_list()
+        [0, 2, 4]
+        """
 
-            # Process all entries from self
+        def _impl() -> Generator[T, None, None]:
+            other_keys = self._key_set(other, other_key, error_rate)
             for entry in self:
-                entry_key = key(entry)
-                matches: Optional[List[_T1]] = other_lookup.get(entry_key)
+                if key(entry) in other_keys:
+                    yield entry
+
+        return self._keep_order(_impl())
 
-                if matches:
-                    matched_other_keys.add(entry_key)
-                    for match in matches:
-                        yield (entry, match)
+    def filter_not_in(
+        self,
+        other: Union[Iterable[_T1], JoinIndex[_T1]],
+        key: Callable[[T], Hashable] = identity,
+        other_key: Callable[[_T1], Hashable] = identity,
+        error_rate: Optional[float] = None,
+    ) -> "Fluent[T]":
+        """Yield elements of the iterable where *key* matches *other_key* applied to no entry of *other*
+
+        Only the keys of *other* are held in memory. Setting *error_rate* stores the keys in a Bloom filter
+        instead of a set, which uses far less memory but drops non-matching elements with probability *error_rate*
+
+        Note: filter_not_in loads the keys of *other* into memory
+
+        >>> flu(range(6)).filter_not_in([0, 2, 2, 4]).to_list()
+        [1, 3, 5]
+        """
+
+        def _impl() -> Generator[T, None, None]:
+            other_keys = self._key_set(other, other_key, error_rate)
+            for entry in self:
+                if key(entry) not in other_keys:
+                    yield entry
+
+        return self._keep_order(_impl())
+
+    def join_lookup(
+        self,
+        fetch_many: Callable[[List[Hashable]], Mapping[Hashable, _T1]],
+        key: Callable[[T], Hashable] = identity,
+        batch_size: int = 100,
+        cache_size: int = 1024,
+    ) -> "Fluent[Tuple[T, Union[_T1, None]]]":
+        """Join the iterable against an external source by resolving *key* of each element with *fetch_many*
+
+        *fetch_many* receives a list of up to *batch_size* distinct keys, e.g. to run one query with an IN clause,
+        and returns a mapping from keys to the matching entry. Keys missing from the mapping are paired with None.
+        The results for the *cache_size* most recently used keys, including missing ones, are cached
+        so frequent keys are only fetched once. Elements are yielded in their original order
+
+        >>> table = {0: 'zero', 2: 'two'}
+        >>> fetch_many = lambda keys: {k: table[k] for k in keys if k in table}
+        >>> flu(range(4)).join_lookup(fetch_many, batch_size=2).to_list()
+        [(0, 'zero'), (1, None), (2, 'two'), (3, None)]
+        """
+
+        def _impl() -> Generator[Tuple[T, Union[_T1, None]], None, None]:
+            if batch_size < 1:
+                raise ValueError("batch_size must be >= 1")
+            cache: LRUCache[Optional[_T1]] = LRUCache(cache_size)
+
+            for batch in self.chunk(batch_size):
+                batch_keys = [key(entry) for entry in batch]
+                resolved: Dict[Hashable, Optional[_T1]] = {}
+                missing: List[Hashable] = []
+
+                for entry_key in batch_keys:
+                    if entry_key in resolved:
+                        continue
+                    cached = cache.get(entry_key, _EMPTY)
+                    if isinstance(cached, Empty):
+                        missing.append(entry_key)
+                        resolved[entry_key] = None
+                    else:
+                        resolved[entry_key] = cached
+
+                if missing:
+                    fetched = fetch_many(missing)
+                    for entry_key in missing:
+                        resolved[entry_key] = fetched.get(entry_key)
+                        cache.put(entry_key, resolved[entry_key])
+
+                for entry, entry_key in zip(batch, batch_keys):
+                    yield (entry, resolved[entry_key])
+
+        return Fluent(_impl())
+
+    def join_asof(
+        self,
+        other: Iterable[_T1],
+        on: Callable[[T], Any],
+        other_on: Optional[Callable[[_T1], Any]] = None,
+        by: Optional[Callable[[T], Hashable]] = None,
+        other_by: Optional[Callable[[_T1], Hashable]] = None,
+        direction: str = "backward",
+        tolerance: Any = None,
+    ) -> "Fluent[Tuple[T, Union[_T1, None]]]":
+        """Join each element of the iterable with the nearest entry of *other* by time rather than by equal keys
+
+        *on* and *other_on* (defaults to *on*) compute the time of each element and entry. Both iterables must be
+        sorted ascending by time. *direction* is one of "backward" to match the last entry at or before the element,
+        "forward" to match the first entry at or after the element or "nearest" for whichever is closest.
+        When *by* and *other_by* (defaults to *by*) are provided, only entries with an equal key are matched.
+        Matches further than *tolerance* from the element are discarded. Unmatched elements are paired with None
+
+        Only the latest entry per *by* key is retained, plus, for "forward" and "nearest", the entries read
+        ahead of the element's time. Setting *tolerance* bounds how far ahead *other* is read
+
+        >>> trades = [1, 5, 10]
+        >>> quotes = [0, 4, 6]
+        >>> flu(trades).join_asof(quotes, on=lambda t: t).to_list()
+        [(1, 0), (5, 4), (10, 6)]
+        >>> flu(trades).join_asof(quotes, on=lambda t: t, direction="forward").to_list()
+        [(1, 4), (5, 6), (10, None)]
+        >>> flu(trades).join_asof(quotes, on=lambda t: t, direction="nearest", tolerance=2).to_list()
+        [(1, 0), (5, 4), (10, None)]
+        """
+
+        def _impl() -> Generator[Tuple[T, Union[_T1, None]], None, None]:
+            if direction not in ("backward", "forward", "nearest"):
+                raise ValueError("direction must be one of 'backward', 'forward' or 'nearest'")
+
+            other_on_func: Callable[[_T1], Any] = cast(Callable[[_T1], Any], on) if other_on is None else other_on
+            by_func: Callable[[T], Hashable] = (lambda _: None) if by is None else by
+            other_by_func: Callable[[_T1], Hashable] = (
+                cast(Callable[[_T1], Hashable], by_func) if other_by is None else other_by
+            )
+
+            other_iter = iter(other)
+            # Entries of other read beyond the time of the current element, in time order
+            lookahead: Deque[Tuple[Any, Hashable, _T1]] = deque()
+            # The same entries split by by key, so a forward match only checks the head of its key's deque
+            lookahead_by: Dict[Hashable, Deque[Tuple[Any, _T1]]] = {}
+            # Last entry of other at or before the time of the current element, per by key
+            latest: Dict[Hashable, Tuple[Any, _T1]] = {}
+            # First entry of other at the same time as the latest entry, per by key, matched by "forward" on ties
+            first_at_latest: Dict[Hashable, Tuple[Any, _T1]] = {}
+            prev_other_time: Any = _EMPTY
+
+            def pull() -> bool:
+                nonlocal prev_other_time
+                for entry_other in other_iter:
+                    other_time = other_on_func(entry_other)
+                    if not isinstance(prev_other_time, Empty) and other_time < prev_other_time:
+                        raise ValueError("other elements are not sorted by time")
+                    prev_other_time = other_time
+                    other_by_key = other_by_func(entry_other)
+                    lookahead.append((other_time, other_by_key, entry_other))
+                    lookahead_by.setdefault(other_by_key, deque()).append((other_time, entry_other))
+                    return True
+                return False
+
+            prev_time: Any = _EMPTY
+            for entry in self:
+                entry_time = on(entry)
+                if not isinstance(prev_time, Empty) and entry_time < prev_time:
+                    raise ValueError("flu elements are not sorted by time")
+                prev_time = entry_time
+                entry_by = by_func(entry)
+
+                while (lookahead or pull()) and not entry_time < lookahead[0][0]:
+                    other_time, other_by_key, entry_other = lookahead.popleft()
+                    prev_latest = latest.get(other_by_key)
+                    if prev_latest is None or prev_latest[0] < other_time:
+                        first_at_latest[other_by_key] = (other_time, entry_other)
+                    latest[other_by_key] = (other_time, entry_other)
+                    same_key = lookahead_by[other_by_key]
+                    same_key.popleft()
+                    if not same_key:
+                        del lookahead_by[other_by_key]
+
+                behind = latest.get(entry_by)
+                ahead: Optional[Tuple[Any, _T1]] = None
+                if direction != "backward":
+                    if behind is not None and not behind[0] < entry_time:
+                        ahead = first_at_latest[entry_by]
+                    else:
+                        while (
+                            entry_by not in lookahead_by
+                            and (tolerance is None or not lookahead or lookahead[-1][0] - entry_time <= tolerance)
+                            and pull()
+                        ):
+                            pass
+                        if entry_by in lookahead_by:
+                            ahead = lookahead_by[entry_by][0]
+                            if tolerance is not None and ahead[0] - entry_time > tolerance:
+                                ahead = None
+                    if direction == "forward":
+                        behind = None
+
+                if behind is not None and tolerance is not None and entry_time - behind[0] > tolerance:
+                    behind = None
+
+                if behind is not None and ahead is not None:
+                    match: Optional[_T1] = ahead[1] if ahead[0] - entry_time < entry_time - behind[0] else behind[1]
+                elif behind is not None:
+                    match = behind[1]
                 else:
-                    yield (entry, None)
+                    match = None if ahead is None else ahead[1]
+                yield (entry, match)
 
-            # Yield unmatched entries from other
-            unmatched_keys = other_keys_seen - matched_other_keys
-            for unmatched_key in unmatched_keys:
-                for entry_other in other_lookup[unmatched_key]:
-                    yield (None, entry_other)
+        return Fluent(_impl())
+
+    def join_interval(
+        self,
+        other: Iterable[_T1],
+        start: Callable[[T], Any],
+        end: Callable[[T], Any],
+        other_start: Optional[Callable[[_T1], Any]] = None,
+        other_end: Optional[Callable[[_T1], Any]] = None,
+    ) -> "Fluent[Tuple[T, _T1]]":
+        """Join elements of the iterable with entries of *other* whose intervals overlap
+
+        Intervals are half open, from *start* up to but excluding *end*. *other_start* and *other_end* default to
+        *start* and *end*. Both iterables must be sorted ascending by start. Elements without an overlapping entry
+        are filtered from the results
+
+        Only entries of *other* that may still overlap a later element are held in memory
+
+        >>> shifts = [(0, 8), (8, 16)]
+        >>> events = [(2, 3), (7, 9), (20, 21)]
+        >>> flu(shifts).join_interval(events, start=lambda x: x[0], end=lambda x: x[1]).to_list()
+        [((0, 8), (2, 3)), ((0, 8), (7, 9)), ((8, 16), (7, 9))]
+        """
+
+        def _impl() -> Generator[Tuple[T, _T1], None, None]:
+            other_start_func: Callable[[_T1], Any] = (
+                cast(Callable[[_T1], Any], start) if other_start is None else other_start
+            )
+            other_end_func: Callable[[_T1], Any] = cast(Callable[[_T1], Any], end) if other_end is None else other_end
+
+            other_iter = iter(other)
+            next_other: Union[_T1, Empty] = next(other_iter, _EMPTY)
+            active: List[_T1] = []
+
+            prev_start: Any = _EMPTY
+            for entry in self:
+                entry_start, entry_end = start(entry), end(entry)
+                if not isinstance(prev_start, Empty) and entry_start < prev_start:
+                    raise ValueError("flu elements are not sorted by start")
+                prev_start = entry_start
+
+                # Entries not yet read start at or after entry_end so can not overlap
+                while not isinstance(next_other, Empty) and other_start_func(next_other) < entry_end:
+                    active.append(next_other)
+                    next_other = next(other_iter, _EMPTY)
+                    if not isinstance(next_other, Empty) and other_start_func(next_other) < other_start_func(
+                        active[-1]
+                    ):
+                        raise ValueError("other elements are not sorted by start")
+
+                # Later elements start at or after entry_start so entries ending before it are no longer needed
+                active = [entry_other for entry_other in active if entry_start < other_end_func(entry_other)]
+
+                for entry_other in active:
+                    if other_start_func(entry_other) < entry_end:
+                        yield (entry, entry_other)
 
         return Fluent(_impl())
 
-    def shuffle(self) -> "Fluent[T]":
+    def cache(self, max_items: Optional[int] = None, spill_dir: Optional[str] = None) -> FluentCache[T]:
+        """Return a FluentCache of the iterable, which can be iterated any number of times while reading
+        the iterable only once
+
+        Up to *max_items* elements are held in memory and later elements are pickled to a temporary file under
+        *spill_dir*. Without *max_items*, every element is held in memory
+
+        >>> cached = flu(range(3)).cache(max_items=1)
+        >>> flu(cached).to_list()
+        [0, 1, 2]
+        >>> flu(cached).map(lambda x: x * 2).to_list()
+        [0, 2, 4]
+        """
+        return FluentCache(self, max_items, spill_dir)
+
+    def to_index(self, key: Callable[[T], Hashable] = identity) -> JoinIndex[T]:
+        """Collect the iterable into a JoinIndex keyed by *key* that can be reused by multiple joins
+
+        Note: to_index loads the entire iterable into memory
+
+        >>> index = flu(['a', 'bb', 'cc']).to_index(key=len)
+        >>> flu([1, 2]).join_inner(index).to_list()
+        [(1, 'a'), (2, 'bb'), (2, 'cc')]
+        """
+        lookup: Dict[Hashable, List[T]] = defaultdict(list)
+        for entry in self:
+            lookup[key(entry)].append(entry)
+        return JoinIndex(lookup)
+
+    def sample(self, k: int, weight: Optional[Callable[[T], float]] = None, seed: Any = None) -> "Fluent[T]":
+        """Draw a random sample of *k* elements from the iterable in a single pass holding only *k* elements in memory
+
+        Every element is equally likely to be drawn unless *weight* is provided, a function returning each
+        element's positive sampling weight. *seed* makes the sample reproducible. The sample is yielded once
+        the iterable is exhausted and is not in iterable order. When the iterable has fewer than *k* elements,
+        they are all yielded
+
+        >>> flu(range(1000)).sample(3, seed=0).to_list()
+        [292, 917, 859]
+        """
+
+        def _impl() -> Generator[T, None, None]:
+            if k < 0:
+                raise ValueError("k must be >= 0")
+            rng = Random(seed)
+
+            def uniform() -> float:
+                # Uniform on (0, 1] so it is safe to take logarithms
+                return 1.0 - rng.random()
+
+            if k == 0:
+                return
+
+            if weight is None:
+                # Algorithm L, jumping over elements that would not enter the reservoir
+                iterator = iter(self)
+                reservoir = list(islice(iterator, k))
+                w = math.exp(math.log(uniform()) / k)
+                while w < 1.0:
+                    skip = math.floor(min(math.log(uniform()) / math.log1p(-w), sys.maxsize))
+                    val = next(islice(iterator, skip, None), _EMPTY)
+                    if isinstance(val, Empty):
+                        break
+                    reservoir[rng.randrange(k)] = val
+                    w *= math.exp(math.log(uniform()) / k)
+                yield from reservoir
+                return
+
+            # Algorithm A-Res, keeping the k largest keys u ** (1 / weight), compared as logarithms
+            heap: List[Tuple[float, int, T]] = []
+            for i, val in enumerate(self):
+                val_weight = weight(val)
+                if not val_weight > 0:
+                    continue
+                val_key = math.log(uniform()) / val_weight
+                if len(heap) < k:
+                    heapq.heappush(heap, (val_key, i, val))
+                elif val_key > heap[0][0]:
+                    heapq.heapreplace(heap, (val_key, i, val))
+            for _, _, val in heap:
+                yield val
+
+        return Fluent(_impl())
+
+    def sample_fraction(self, p: float, seed: Any = None) -> "Fluent[T]":
+        """Yield each element of the iterable independently with probability *p*
+
+        Rather than drawing a random number per element, the number of elements to skip before the next
+        yielded element is drawn directly. *seed* makes the sample reproducible
+
+        >>> flu(range(20)).sample_fraction(0.25, seed=0).to_list()
+        [6, 11, 13, 15, 18]
+        """
+
+        def _impl() -> Generator[T, None, None]:
+            if not 0.0 <= p <= 1.0:
+                raise ValueError("p must be between 0 and 1")
+            if p == 0.0:
+                return
+            if p == 1.0:
+                yield from self
+                return
+            rng = Random(seed)
+            log_q = math.log1p(-p)
+            iterator = iter(self)
+            while True:
+                skip = math.floor(min(math.log(1.0 - rng.random()) / log_q, sys.maxsize))
+                val = next(islice(iterator, skip, None), _EMPTY)
+                if isinstance(val, Empty):
+                    return
+                yield val
+
+        return self._keep_order(_impl())
+
+    def shuffle(self, buffer_size: Optional[int] = None, seed: Any = None) -> "Fluent[T]":
         """Randomize the order of elements in the interable
 
         Note: shuffle loads the entire iterable into memory
 
+        When *buffer_size* is provided, only *buffer_size* elements are held in memory. Each new element replaces
+        a randomly chosen element of the buffer, which is yielded, so output begins immediately but no element
+        moves more than *buffer_size* positions earlier than in the iterable. *seed* makes the order reproducible
+
         >>> flu([3,6,1]).shuffle().to_list()
         [6, 1, 3]
+
+        >>> flu(range(10)).shuffle(buffer_size=3, seed=0).to_list()
+        [1, 3, 0, 4, 2, 6, 8, 5, 7, 9]
         """
-        dat: List[T] = self.to_list()
-        return Fluent(sample(dat, len(dat)))
+        # Without a seed, use the module level generator so that random.seed still applies
+        rand_sample, rand_index, rand_shuffle = sample, randrange, shuffle
+        if seed is not None:
+            rng = Random(seed)
+            rand_sample, rand_index, rand_shuffle = rng.sample, rng.randrange, rng.shuffle
+
+        if buffer_size is None:
+            dat: List[T] = self.to_list()
+            return Fluent(rand_sample(dat, len(dat)))
+
+        def _impl() -> Generator[T, None, None]:
+            if buffer_size < 1:
+                raise ValueError("buffer_size must be >= 1")
+            buffer: List[T] = []
+            for val in self:
+                if len(buffer) < buffer_size:
+                    buffer.append(val)
+                    continue
+                i = rand_index(buffer_size)
+                yield buffer[i]
+                buffer[i] = val
+            rand_shuffle(buffer)
+            yield from buffer
+
+        return Fluent(_impl())
 
     @overload
     def group_by(self, key: None = ..., sort: bool = ...) -> "Fluent[Tuple[T, Fluent[T]]]": ...
@@ -445,7 +1854,9 @@ class Fluent(Generic[T]):
 
         *key* is a function to compute a key value used in grouping and sorting for each element. When *key* is None, elements are grouped on their own value
 
-        When the iterable is pre-sorted according to *key*, setting *sort* to False will prevent loading the dataset into memory and improve performance
+        When the iterable is pre-sorted according to *key*, setting *sort* to False will prevent loading the dataset into memory and improve performance.
+        Sorting is also skipped when the iterable is known to be ordered ascending by the same *key* function object,
+        see assume_sorted
 
         >>> flu([2, 4, 2, 4]).group_by().to_list()
         [(2, <flu object>), (4, <flu object>)]
@@ -468,7 +1879,7 @@ class Fluent(Generic[T]):
         """
 
         key_func: Callable[[T], Any] = identity if key is None else key
-        gen = self.sort(key_func) if sort else self
+        gen = self.sort(key_func) if sort and not self._is_sorted_by(key_func, reverse=False) else self
         return Fluent(groupby(gen, key_func)).map(lambda x: (x[0], flu([y for y in x[1]])))
 
     def unique(self, key: Callable[[T], Hashable] = identity) -> "Fluent[T]":
@@ -479,6 +1890,11 @@ class Fluent(Generic[T]):
 
         >>> flu([2, -3, -2, 3]).unique(key=abs).to_list()
         [2, -3]
+
+        When the iterable is known to be ordered by *key*, see assume_sorted, only the previous key is retained
+
+        >>> flu([1, 1, 2, 2]).assume_sorted().unique().to_list()
+        [1, 2]
         """
 
         def _impl() -> Generator[T, None, None]:
@@ -491,30 +1907,39 @@ class Fluent(Generic[T]):
                     seen.add(x_hash)
                     yield x
 
-        return Fluent(_impl())
+        def _impl_sorted() -> Generator[T, None, None]:
+            prev: Any = _EMPTY
+            for x in self:
+                x_hash = key(x)
+                if isinstance(prev, Empty) or x_hash != prev:
+                    prev = x_hash
+                    yield x
+
+        return self._keep_order(_impl_sorted() if self._is_sorted_by(key) else _impl())
 
     ### End Non-Constant Memory ###
 
     ### Side Effect ###
-    def rate_limit(self, per_second: Union[int, float] = 100) -> "Fluent[T]":
+    def rate_limit(self, per_second: Union[int, float, TokenBucket] = 100) -> "Fluent[T]":
         """Restrict consumption of iterable to n item  *per_second*
 
+        *per_second* may also be a TokenBucket, which allows bursts and can be shared to hold several
+        pipelines to a single budget
+
         >>> import time
-        >>> start_time = time.time()
-        >>> _ = flu(range(3)).rate_limit(3).to_list()
-        >>> print('Runtime', int(time.time() - start_time))
-        1.00126 # approximately 1 second for 3 items
+        >>> start_time = time.monotonic()
+        >>> _ = flu(range(4)).rate_limit(3).to_list()
+        >>> print('Runtime', int(time.monotonic() - start_time))
+        1.00126 # approximately 1 second for 4 items
         """
+        bucket = per_second if isinstance(per_second, TokenBucket) else TokenBucket(per_second)
 
         def _impl() -> Generator[T, None, None]:
-            wait_time = 1.0 / per_second
             for val in self:
-                start_time = time.time()
+                bucket.acquire()
                 yield val
-                call_duration = time.time() - start_time
-                time.sleep(max(wait_time - call_duration, 0.0))
 
-        return Fluent(_impl())
+        return self._keep_order(_impl())
 
     def side_effect(
         self,
@@ -547,6 +1972,85 @@ class Fluent(Generic[T]):
                 if after is not None:
                     after()
 
+        return self._keep_order(_impl())
+
+    def checkpoint(self, path: str, fingerprint: Any) -> "Fluent[T]":
+        """Persist elements to the file at *path* as they pass through, and on later runs stream them back
+        from the file instead of iterating the upstream stages at all
+
+        The file is only kept once the iterable is fully consumed. *fingerprint* is any picklable value
+        identifying the source and upstream stages, such as input file names with modification times and a
+        version string. It is digested into the file, and a file with a different fingerprint, or that is not
+        a checkpoint file, is rebuilt
+
+        >>> import os, tempfile
+        >>> path = os.path.join(tempfile.mkdtemp(), 'squares.ckpt')
+        >>> flu(range(4)).map(lambda x: x * x).checkpoint(path, fingerprint='v1').to_list()
+        [0, 1, 4, 9]
+        >>> flu(range(0)).checkpoint(path, fingerprint='v1').to_list()
+        [0, 1, 4, 9]
+        """
+        digest = hashlib.sha256(pickle.dumps(fingerprint, pickle.HIGHEST_PROTOCOL)).hexdigest()
+
+        def _impl() -> Generator[T, None, None]:
+            try:
+                with open(path, "rb") as f:
+                    try:
+                        header = pickle.load(f)
+                    except (pickle.UnpicklingError, EOFError):
+                        # Not a checkpoint file, rebuild it
+                        header = None
+                    if header == digest:
+                        while True:
+                            try:
+                                yield pickle.load(f)
+                            except EOFError:
+                                return
+            except FileNotFoundError:
+                pass
+
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    pickle.dump(digest, f, pickle.HIGHEST_PROTOCOL)
+                    for val in self:
+                        pickle.dump(val, f, pickle.HIGHEST_PROTOCOL)
+                        yield val
+                os.replace(tmp_path, path)
+            finally:
+                with suppress(FileNotFoundError):
+                    os.remove(tmp_path)
+
+        return Fluent(_impl())
+
+    def resumable(self, state_path: str, every: int = 1000) -> "Fluent[T]":
+        """Commit the number of elements consumed so far to the state file at *state_path* every *every*
+        elements, and on later runs skip the elements already committed
+
+        An element counts as consumed once the next one is requested, so after a crash the elements since
+        the last commit are delivered again. The state file is removed when the iterable is exhausted.
+        Skipped elements are still drawn from upstream, so apply resumable directly to the source
+
+        >>> import os, tempfile
+        >>> path = os.path.join(tempfile.mkdtemp(), 'job.state')
+        >>> flu(range(10)).resumable(path, every=2).take(5).to_list()
+        [0, 1, 2, 3, 4]
+        >>> flu(range(10)).resumable(path, every=2).to_list()
+        [4, 5, 6, 7, 8, 9]
+        """
+
+        def _impl() -> Generator[T, None, None]:
+            if every < 1:
+                raise ValueError("every must be >= 1")
+
+            offset = read_offset(state_path)
+            for offset, val in enumerate(islice(self, offset, None), offset + 1):
+                yield val
+                if offset % every == 0:
+                    write_offset(state_path, offset)
+            with suppress(FileNotFoundError):
+                os.remove(state_path)
+
         return Fluent(_impl())
 
     ### End Side Effect ###
@@ -564,6 +2068,148 @@ class Fluent(Generic[T]):
 
         return Fluent(_impl())
 
+    def map_cached(
+        self,
+        func: Callable[[T], _T1],
+        maxsize: int = 128,
+        key: Callable[[T], Hashable] = identity,
+        ttl: Optional[float] = None,
+        cache: Optional[LRUCache[_T1]] = None,
+    ) -> "Fluent[_T1]":
+        """Apply *func* to each element of iterable, reusing the results for the *maxsize* most recently
+        used keys
+
+        *key* maps each element to the cache key, so unhashable elements can be cached. Results older than
+        *ttl* seconds are recomputed. Pass an LRUCache as *cache* to read its hit, miss and eviction counts
+        or share it between stages, in which case *maxsize* and *ttl* are taken from it
+
+        >>> flu([1, 2, 1, 2]).map_cached(lambda x: x * 10, maxsize=2).to_list()
+        [10, 20, 10, 20]
+        >>> flu([{'id': 1}, {'id': 1}]).map_cached(lambda x: x['id'], key=lambda x: x['id']).to_list()
+        [1, 1]
+        """
+
+        def _impl() -> Generator[_T1, None, None]:
+            results: LRUCache[_T1] = cache if cache is not None else LRUCache(maxsize, ttl)
+            for val in self._iterator:
+                val_key = key(val)
+                result = results.get(val_key, _EMPTY)
+                if isinstance(result, Empty):
+                    result = func(val)
+                    results.put(val_key, result)
+                yield result
+
+        return Fluent(_impl())
+
+    def map_batched(
+        self, func: Callable[[List[T]], Sequence[_T1]], batch_size: int, max_wait: Optional[float] = None
+    ) -> "Fluent[_T1]":
+        """Apply *func* to lists of up to *batch_size* elements and yield its results individually, in order
+
+        *func* must return one result per element of the list it receives, e.g. a bulk insert or vectorized
+        model call. Lists are built with chunk, so *max_wait* bounds how long a list can wait to fill
+
+        >>> flu(range(5)).map_batched(lambda xs: [x * x for x in xs], batch_size=2).to_list()
+        [0, 1, 4, 9, 16]
+        """
+
+        def _impl() -> Generator[_T1, None, None]:
+            if batch_size < 1:
+                raise ValueError("batch_size must be >= 1")
+
+            for batch in self.chunk(batch_size, max_wait=max_wait):
+                results = func(batch)
+                if len(results) != len(batch):
+                    raise ValueError(f"func returned {len(results)} results for a batch of {len(batch)} elements")
+                yield from results
+
+        return Fluent(_impl())
+
+    def map_resilient(
+        self,
+        func: Callable[[T], _T1],
+        timeout: Optional[float] = None,
+        retries: int = 0,
+        backoff: float = 0.1,
+        hedge_after: Union[float, str, None] = None,
+        max_workers: int = 8,
+    ) -> "Fluent[_T1]":
+        """Apply *func* to up to *max_workers* elements of iterable at a time on a pool of threads, retrying
+        failed calls and hedging slow ones, while yielding the results in their original order
+
+        A call that raises, or runs longer than *timeout* seconds, is retried up to *retries* times, waiting
+        *backoff* seconds before the first retry and doubling the wait after each. When a call has run for
+        *hedge_after* seconds, a duplicate call is started and whichever finishes first is used. *hedge_after*
+        may also be a percentile of the latencies observed so far, like 'p95', which takes effect after 20
+        successful calls. The error of the final attempt is raised once its element is reached
+
+        Note: the pool has twice *max_workers* threads so hedged and retried calls need not wait behind the calls
+        they replace. Calls that time out or lose a hedge can not be interrupted and occupy a thread until they return
+
+        >>> flu(range(4)).map_resilient(lambda x: x * x, timeout=5, retries=2, hedge_after='p95').to_list()
+        [0, 1, 4, 9]
+        """
+
+        def _impl() -> Generator[_T1, None, None]:
+            if max_workers < 1:
+                raise ValueError("max_workers must be >= 1")
+            percentile: Optional[float] = None
+            hedge_delay: Optional[float] = None
+            if isinstance(hedge_after, str):
+                match = re.fullmatch(r"p(\d+(?:\.\d+)?)", hedge_after)
+                if match is None or not 0 < float(match.group(1)) < 100:
+                    raise ValueError("hedge_after must be a number of seconds or a percentile like 'p95'")
+                percentile = float(match.group(1))
+            else:
+                hedge_delay = hedge_after
+
+            latencies: Deque[float] = deque(maxlen=1000)
+            yielded = measured = 0
+            calls: Deque[_ResilientCall[T, _T1]] = deque()
+            source = iter(self)
+            exhausted = False
+            pool = ThreadPoolExecutor(2 * max_workers)
+            try:
+                while True:
+                    while not exhausted and len(calls) < max_workers:
+                        try:
+                            val = next(source)
+                        except StopIteration:
+                            exhausted = True
+                        else:
+                            calls.append(_ResilientCall(val, func, pool, time.monotonic()))
+
+                    if not calls:
+                        return
+
+                    if percentile is not None and len(latencies) >= 20 and measured != yielded:
+                        measured = yielded
+                        ordered = sorted(latencies)
+                        hedge_delay = ordered[min(int(len(ordered) * percentile / 100), len(ordered) - 1)]
+
+                    now = time.monotonic()
+                    wake_at = min(call.poll(now, timeout, retries, backoff, hedge_delay, latencies) for call in calls)
+
+                    head = calls[0]
+                    if head.done:
+                        calls.popleft()
+                        if isinstance(head.result, Empty):
+                            raise cast(BaseException, head.error)
+                        yield head.result
+                        yielded += 1
+                        continue
+
+                    running = [future for call in calls for future in call.futures if not future.done()]
+                    wait_time = None if wake_at == math.inf else max(wake_at - time.monotonic(), 0.0)
+                    if running:
+                        wait(running, timeout=wait_time, return_when=FIRST_COMPLETED)
+                    elif wait_time is not None:
+                        time.sleep(wait_time)
+            finally:
+                pool.shutdown(wait=False, cancel_futures=True)
+
+        return Fluent(_impl())
+
     def map_item(self: "Fluent[SupportsGetItem[T]]", item: Hashable) -> "Fluent[T]":
         """Extracts *item* from every element of the iterable
 
@@ -602,7 +2248,7 @@ class Fluent(Generic[T]):
                 if func(val, *args, **kwargs):
                     yield val
 
-        return Fluent(_impl())
+        return self._keep_order(_impl())
 
     def reduce(self, func: Callable[[T, T], T]) -> T:
         """Apply a function of two arguments cumulatively to the items of the iterable,
@@ -693,7 +2339,7 @@ class Fluent(Generic[T]):
         >>> flu(range(10)).take(2).to_list()
         [0, 1]
         """
-        return Fluent(islice(self._iterator, n))
+        return self._keep_order(islice(self._iterator, n))
 
     def take_while(self, predicate: Callable[[T], object]) -> "Fluent[T]":
         """Yield elements from the chainable so long as the predicate is true
@@ -701,7 +2347,7 @@ class Fluent(Generic[T]):
         >>> flu(range(10)).take_while(lambda x: x < 3).to_list()
         [0, 1, 2]
         """
-        return Fluent(takewhile(predicate, self._iterator))
+        return self._keep_order(takewhile(predicate, self._iterator))
 
     def drop_while(self, predicate: Callable[[T], object]) -> "Fluent[T]":
         """Drop elements from the chainable as long as the predicate is true;
@@ -710,15 +2356,22 @@ class Fluent(Generic[T]):
         >>> flu(range(10)).drop_while(lambda x: x < 3).to_list()
         [3, 4, 5, 6, 7, 8, 9]
         """
-        return Fluent(dropwhile(predicate, self._iterator))
+        return self._keep_order(dropwhile(predicate, self._iterator))
 
-    def chunk(self, n: int) -> "Fluent[List[T]]":
+    def chunk(self, n: int, max_wait: Optional[float] = None) -> "Fluent[List[T]]":
         """Yield lists of elements from iterable in groups of *n*
 
         if the iterable is not evenly divisiible by *n*, the final list will be shorter
 
+        When *max_wait* is provided, a shorter list is also yielded once *max_wait* seconds have passed since
+        the first element of the list arrived. The iterable is then read on a background thread so that a
+        blocking source, like a pipe or socket, can not delay a list beyond *max_wait*
+
         >>> flu(range(10)).chunk(3).to_list()
         [[0, 1, 2], [3, 4, 5], [6, 7, 8], [9]]
+
+        >>> flu(range(10)).chunk(3, max_wait=0.5).to_list()
+        [[0, 1, 2], [3, 4, 5], [6, 7, 8], [9]]
         """
 
         def _impl() -> Generator[List[T], None, None]:
@@ -730,7 +2383,33 @@ class Fluent(Generic[T]):
                 else:
                     return
 
-        return Fluent(_impl())
+        def _impl_timed() -> Generator[List[T], None, None]:
+            # Like the untimed mode, no lists are yielded for a size below 1
+            if n < 1:
+                return
+            reader = _BackgroundReader([self._iterator], buffer_size=n)
+            try:
+                while True:
+                    vals: List[T] = []
+                    deadline: Optional[float] = None
+                    while len(vals) < n:
+                        timeout = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+                        try:
+                            received = reader.get(timeout)
+                        except queue.Empty:
+                            break
+                        if isinstance(received, Empty):
+                            if vals:
+                                yield vals
+                            return
+                        vals.append(received[1])
+                        if deadline is None and max_wait is not None:
+                            deadline = time.monotonic() + max_wait
+                    yield vals
+            finally:
+                reader.close()
+
+        return Fluent(_impl() if max_wait is None else _impl_timed())
 
     def flatten(
         self,
@@ -878,26 +2557,287 @@ class Fluent(Generic[T]):
 
         return Fluent(_impl())
 
+    def window_by_time(
+        self,
+        ts_key: Callable[[T], Any],
+        size: Any,
+        slide: Any = None,
+        allowed_lateness: Any = 0,
+        agg: Optional[Callable[[List[T]], Any]] = None,
+    ) -> "Fluent[Tuple[Any, Any]]":
+        """Yield (window start, elements) for time windows of width *size* over the numeric timestamp *ts_key*
+
+        Windows start at multiples of *slide*, which defaults to *size* for non-overlapping tumbling windows.
+        A window is yielded, in order of start, once an element at least *allowed_lateness* past its end
+        arrives, so only open windows are held in memory. Elements arriving after their windows were yielded
+        are dropped. When *agg* is provided, it is applied to the list of elements in each window
+
+        >>> flu([1, 3, 7, 12, 14]).window_by_time(lambda x: x, size=5).to_list()
+        [(0, [1, 3]), (5, [7]), (10, [12, 14])]
+
+        >>> flu([1, 3, 7, 12, 14]).window_by_time(lambda x: x, size=10, slide=5, agg=len).to_list()
+        [(-5, 2), (0, 3), (5, 3), (10, 2)]
+        """
+
+        def _impl() -> Generator[Tuple[Any, Any], None, None]:
+            window_slide = size if slide is None else slide
+            if not size > 0 or not window_slide > 0:
+                raise ValueError("size and slide must be > 0")
+
+            open_windows: Dict[Any, List[T]] = {}
+            watermark: Any = _EMPTY
+
+            def emit(start: Any) -> Tuple[Any, Any]:
+                vals = open_windows.pop(start)
+                return (start, vals if agg is None else agg(vals))
+
+            for val in self:
+                ts = ts_key(val)
+
+                # Assign to every window containing ts, from the latest starting one backwards
+                start = ts // window_slide * window_slide
+                while start + size > ts:
+                    if isinstance(watermark, Empty) or watermark < start + size:
+                        open_windows.setdefault(start, []).append(val)
+                    start -= window_slide
+
+                if isinstance(watermark, Empty) or watermark < ts - allowed_lateness:
+                    watermark = ts - allowed_lateness
+                    for start in sorted(s for s in open_windows if not watermark < s + size):
+                        yield emit(start)
+
+            for start in sorted(open_windows):
+                yield emit(start)
+
+        return Fluent(_impl())
+
+    def sessionize(
+        self,
+        key: Callable[[T], Hashable],
+        ts_key: Callable[[T], Any],
+        gap: Any,
+        allowed_lateness: Any = 0,
+        agg: Optional[Callable[[List[T]], Any]] = None,
+    ) -> "Fluent[Tuple[Hashable, Any]]":
+        """Yield (key, elements) for each session, a run of elements sharing *key* with no more than *gap*
+        between consecutive *ts_key* timestamps
+
+        A session is yielded once an element arrives more than *gap* after the session's last element, so only
+        open sessions are held in memory. The iterable should be ordered by timestamp. Elements up to
+        *allowed_lateness* out of order are reordered in a buffer and later elements are dropped.
+        When *agg* is provided, it is applied to the list of elements in each session
+
+        >>> clicks = [('a', 1), ('b', 2), ('a', 3), ('a', 10), ('b', 11)]
+        >>> flu(clicks).sessionize(key=lambda x: x[0], ts_key=lambda x: x[1], gap=5, agg=len).to_list()
+        [('b', 1), ('a', 2), ('a', 1), ('b', 1)]
+        """
+
+        def _impl() -> Generator[Tuple[Hashable, Any], None, None]:
+            # Open sessions as [last timestamp, elements], least recently active first
+            sessions: "OrderedDict[Hashable, List[Any]]" = OrderedDict()
+
+            def emit(session_key: Hashable, vals: List[T]) -> Tuple[Hashable, Any]:
+                return (session_key, vals if agg is None else agg(vals))
+
+            def process(ts: Any, val: T) -> Generator[Tuple[Hashable, Any], None, None]:
+                while sessions:
+                    oldest_key, (last_ts, vals) = next(iter(sessions.items()))
+                    if not ts - last_ts > gap:
+                        break
+                    sessions.popitem(last=False)
+                    yield emit(oldest_key, vals)
+
+                session_key = key(val)
+                session = sessions.get(session_key)
+                if session is None:
+                    sessions[session_key] = [ts, [val]]
+                else:
+                    session[0] = ts
+                    session[1].append(val)
+                    sessions.move_to_end(session_key)
+
+            # Reorder buffer of (timestamp, arrival, element)
+            pending: List[Tuple[Any, int, T]] = []
+            released: Any = _EMPTY
+            max_ts: Any = _EMPTY
+
+            for arrival, val in enumerate(self):
+                ts = ts_key(val)
+                if not isinstance(released, Empty) and ts < released:
+                    continue
+                if isinstance(max_ts, Empty) or max_ts < ts:
+                    max_ts = ts
+                heapq.heappush(pending, (ts, arrival, val))
+                while pending and not max_ts - allowed_lateness < pending[0][0]:
+                    released, _, ready = heapq.heappop(pending)
+                    yield from process(released, ready)
+
+            while pending:
+                released, _, ready = heapq.heappop(pending)
+                yield from process(released, ready)
+
+            for session_key, (_, vals) in sessions.items():
+                yield emit(session_key, vals)
+
+        return Fluent(_impl())
+
+    def rolling(self, n: int, agg: str = "sum") -> "Fluent[Any]":
+        """Yield an aggregate of each sliding window of width *n* over the iterable
+
+        *agg* is one of "sum", "mean", "min", "max" or "count", where count is the number of elements in the
+        window that are not None. Aggregates are updated incrementally as the window slides, in O(1) amortized
+        time per element, rather than being recomputed from a new window tuple. Only full windows are aggregated
+
+        >>> flu(range(5)).rolling(3).to_list()
+        [3, 6, 9]
+
+        >>> flu([3, 1, 4, 1, 5]).rolling(2, agg="max").to_list()
+        [3, 4, 4, 5]
+        """
+
+        def _sum() -> Generator[Any, None, None]:
+            window: Deque[Any] = deque()
+            total: Any = 0
+            for i, val in enumerate(self, start=1):
+                window.append(val)
+                total += val
+                if len(window) > n:
+                    total -= window.popleft()
+                if i % n == 0:
+                    # Periodically recompute to stop floating point error accumulating
+                    total = sum(window)
+                if len(window) == n:
+                    yield total / n if agg == "mean" else total
+
+        def _extreme() -> Generator[Any, None, None]:
+            # Candidates for the extreme of the current or a later window, in window order
+            candidates: Deque[Tuple[int, Any]] = deque()
+            for i, val in enumerate(self):
+                if agg == "min":
+                    while candidates and not candidates[-1][1] < val:
+                        candidates.pop()
+                else:
+                    while candidates and not val < candidates[-1][1]:
+                        candidates.pop()
+                candidates.append((i, val))
+                if candidates[0][0] <= i - n:
+                    candidates.popleft()
+                if i >= n - 1:
+                    yield candidates[0][1]
+
+        def _count() -> Generator[int, None, None]:
+            window: Deque[bool] = deque()
+            total = 0
+            for val in self:
+                window.append(val is not None)
+                total += window[-1]
+                if len(window) > n:
+                    total -= window.popleft()
+                if len(window) == n:
+                    yield total
+
+        def _impl() -> Generator[Any, None, None]:
+            if n < 1:
+                raise ValueError("n must be >= 1")
+            if agg in ("sum", "mean"):
+                yield from _sum()
+            elif agg in ("min", "max"):
+                yield from _extreme()
+            elif agg == "count":
+                yield from _count()
+            else:
+                raise ValueError("agg must be one of 'sum', 'mean', 'min', 'max' or 'count'")
+
+        return Fluent(_impl())
+
+    def partition(
+        self,
+        pred: Callable[[T], object],
+        max_buffer: Optional[int] = None,
+        on_full: str = "block",
+        spill_dir: Optional[str] = None,
+    ) -> Tuple["Fluent[T]", "Fluent[T]"]:
+        """Split the iterable into elements where *pred* returns truthy and elements where it returns falsy
+
+        *pred* is called once per element. The two iterators can be consumed independently, buffering
+        elements until they are consumed, with *max_buffer*, *on_full* and *spill_dir* bounding the buffers
+        as for tee
+
+        >>> evens, odds = flu(range(6)).partition(lambda x: x % 2 == 0)
+        >>> evens.to_list()
+        [0, 2, 4]
+        >>> odds.to_list()
+        [1, 3, 5]
+        """
+        to_true, to_false = (0,), (1,)
+        fanout = _Fanout(self, 2, lambda val: to_true if pred(val) else to_false, max_buffer, on_full, spill_dir)
+        return (self._keep_order(fanout.branch(0)), self._keep_order(fanout.branch(1)))
+
+    def split_by(
+        self,
+        key: Callable[[T], Hashable],
+        keys: Iterable[Hashable],
+        max_buffer: Optional[int] = None,
+        on_full: str = "block",
+        spill_dir: Optional[str] = None,
+    ) -> Tuple["Fluent[T]", ...]:
+        """Split the iterable into one iterator per entry of *keys*, yielding the elements where *key* equals it
+
+        *key* is called once per element and elements matching none of *keys* are dropped. Repeated entries of
+        *keys* each get their own iterator of the matching elements. The iterators can be
+        consumed independently, buffering elements until they are consumed, with *max_buffer*, *on_full* and
+        *spill_dir* bounding the buffers as for tee
+
+        >>> a, b = flu(['a1', 'b1', 'a2', 'c1']).split_by(key=lambda x: x[0], keys=['a', 'b'])
+        >>> a.to_list()
+        ['a1', 'a2']
+        >>> b.to_list()
+        ['b1']
+        """
+        split_keys = list(keys)
+        routes: Dict[Hashable, Tuple[int, ...]] = {}
+        for i, split_key in enumerate(split_keys):
+            routes[split_key] = routes.get(split_key, ()) + (i,)
+        fanout = _Fanout(self, len(split_keys), lambda val: routes.get(key(val), ()), max_buffer, on_full, spill_dir)
+        return tuple(self._keep_order(fanout.branch(i)) for i in range(len(split_keys)))
+
     def __iter__(self) -> "Fluent[T]":
         return self
 
     def __next__(self) -> T:
         return next(self._iterator)
 
-    def tee(self, n: int = 2) -> "Fluent[Fluent[T]]":
+    def tee(
+        self, n: int = 2, max_buffer: Optional[int] = None, on_full: str = "block", spill_dir: Optional[str] = None
+    ) -> "Fluent[Fluent[T]]":
         """Return n independent iterators from a single iterable
 
         once tee() has made a split, the original iterable should not be used
         anywhere else; otherwise, the iterable could get advanced without the
         tee objects being informed
 
+        Elements are buffered for iterators that fall behind the others. When *max_buffer* is provided and an
+        iterator falls *max_buffer* elements behind, *on_full* selects whether the leading iterators "block"
+        until it catches up, which requires consuming each iterator on its own thread, or whether to "spill"
+        the elements it has not consumed yet to temporary files under *spill_dir*
+
         >>> copy1, copy2 = flu(range(5)).tee()
         >>> copy1.sum()
         10
         >>> copy2.to_list()
         [0, 1, 2, 3, 4]
+
+        >>> copy1, copy2 = flu(range(5)).tee(max_buffer=2, on_full="spill")
+        >>> copy1.sum()
+        10
+        >>> copy2.to_list()
+        [0, 1, 2, 3, 4]
         """
-        return Fluent((Fluent(x) for x in tee(self, n)))
+        if max_buffer is None:
+            return Fluent((Fluent(x) for x in tee(self, n)))
+        branches = range(n)
+        fanout = _Fanout(self, n, lambda _: branches, max_buffer, on_full, spill_dir)
+        return Fluent((Fluent(fanout.branch(i)) for i in branches))
 
 
 class flu(Fluent[T]):
@@ -1,8 +1,9 @@
+import os
 from tempfile import NamedTemporaryFile
 
 import pytest
 
-from flupy.cli.cli import build_import_dict, main, parse_args
+from flupy.cli.cli import build_import_dict, main, parse_args, read_file
 
 
 def test_parse_args():
@@ -104,6 +105,25 @@ def test_from_file(capsys):
     assert stdout == "HELLO"
 
 
+def test_from_file_resume(capsys, tmp_path):
+    path = tmp_path / "input.txt"
+    path.write_text("a\nbb\nccc\ndddd\n")
+    state = str(tmp_path / "input.state")
+
+    lines = read_file(str(path), state_path=state, every=2)
+    assert [next(lines), next(lines), next(lines)] == ["a\n", "bb\n", "ccc\n"]
+    del lines
+
+    # Resumes after the two committed lines
+    main(["flu", "-f", str(path), "--resume", state, "_.map(str.upper)"])
+    result = capsys.readouterr()
+    assert result.out.split() == ["CCC", "DDDD"]
+    assert not os.path.exists(state)
+
+    with pytest.raises(SystemExit):
+        parse_args(["_", "--resume", state])
+
+
 def test_glob_imports(capsys):
     main(["flu", "flu(env).count()", "-i", "os:environ:env"])
     result = capsys.readouterr()
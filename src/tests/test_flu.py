@@ -1,9 +1,14 @@
+import asyncio
+import os
+import random
 import sys
+import threading
+import time
 from itertools import count, cycle
 
 import pytest
 
-from flupy import flu
+from flupy import JoinIndex, LRUCache, TokenBucket, flu
 
 
 def test_collect():
@@ -113,6 +118,63 @@ def test_unique():
     assert gen.collect() == [a, c]
 
 
+def test_broadcast():
+    res = flu(range(10)).broadcast(
+        lambda f: f.sum(),
+        lambda f: f.filter(lambda x: x % 2).count(),
+        lambda f: f.to_list(),
+        buffer_size=3,
+    )
+    assert res == (45, 5, list(range(10)))
+    assert flu([]).broadcast(lambda f: f.count()) == (0,)
+    assert flu(range(5)).broadcast() == ()
+
+    # A slow sink holds back the source rather than buffering without bound
+    res = flu(range(10)).broadcast(lambda f: f.count(), lambda f: time.sleep(0.3) or f.count(), buffer_size=1)
+    assert res == (10, 10)
+
+    # Iterated once, stopping when every sink has finished
+    source = flu(count())
+    assert source.broadcast(lambda f: f.first(), lambda f: f.take(3000).count(), buffer_size=1000) == (0, 3000)
+    assert next(source) < 10000
+
+    def failing(f):
+        raise RuntimeError("sink failed")
+
+    with pytest.raises(RuntimeError):
+        flu(count()).broadcast(failing, lambda f: f.count(), buffer_size=10)
+
+    with pytest.raises(ValueError):
+        flu(range(5)).broadcast(lambda f: f.count(), buffer_size=0)
+
+
+def test_assume_sorted():
+    assert flu([1, 1, 2, 3, 3]).assume_sorted().unique().collect() == [1, 2, 3]
+    assert flu([3, 3, 1, 1]).assume_sorted(reverse=True, check=True).unique().collect() == [3, 1]
+    assert flu([2, -3, 3]).assume_sorted(key=abs).unique(key=abs).collect() == [2, -3]
+
+    # Carried through order preserving stages
+    gen = flu([1, 2, 2, 3, 4, 4]).assume_sorted().filter(lambda x: x > 1).take(5).unique()
+    assert gen.collect() == [2, 3, 4]
+
+    # group_by skips sorting, so unsorted input is grouped consecutively
+    gen = flu([2, 2, 1, 2]).assume_sorted().group_by().map(lambda x: (x[0], x[1].collect()))
+    assert gen.collect() == [(2, [2, 2]), (1, [1]), (2, [2])]
+
+    # Sortedness established by sort is reused
+    gen = flu([2, 1, 2]).sort().group_by().map(lambda x: x[0])
+    assert gen.collect() == [1, 2]
+
+    # Descending order is re-sorted so group_by keeps its ascending output
+    assert flu([2, 1, 3]).sort(reverse=True).group_by().map(lambda x: x[0]).collect() == [1, 2, 3]
+
+    # A different key does not match the declared order
+    assert flu([1, -1, 1]).assume_sorted().unique(key=abs).collect() == [1]
+
+    with pytest.raises(ValueError):
+        flu([1, 3, 2]).assume_sorted(check=True).collect()
+
+
 def test_side_effect():
     class FakeFile:
         def __init__(self):
@@ -152,11 +214,102 @@ def test_side_effect():
     assert gen_result == [0, 1, 2, 3, 4]
 
 
+def test_checkpoint(tmp_path):
+    path = str(tmp_path / "stage.ckpt")
+    calls = []
+
+    def expensive(x):
+        calls.append(x)
+        return x * x
+
+    assert flu(range(4)).map(expensive).checkpoint(path, fingerprint=("v1", 4)).collect() == [0, 1, 4, 9]
+    assert calls == [0, 1, 2, 3]
+
+    # Upstream stages are skipped when the fingerprint matches
+    assert flu(range(4)).map(expensive).checkpoint(path, fingerprint=("v1", 4)).collect() == [0, 1, 4, 9]
+    assert calls == [0, 1, 2, 3]
+
+    # Rebuilt when the fingerprint changes
+    assert flu(range(2)).map(expensive).checkpoint(path, fingerprint=("v1", 2)).collect() == [0, 1]
+    assert calls == [0, 1, 2, 3, 0, 1]
+
+    # Partially consumed runs are not kept
+    assert flu(range(5)).map(expensive).checkpoint(path, fingerprint="v2").take(2).collect() == [0, 1]
+    assert flu(range(3)).checkpoint(path, fingerprint="v2").collect() == [0, 1, 2]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["stage.ckpt"]
+
+    # Foreign or corrupt files are rebuilt
+    for content in [b"not a pickle", b""]:
+        with open(path, "wb") as f:
+            f.write(content)
+        assert flu(range(2)).checkpoint(path, fingerprint="v3").collect() == [0, 1]
+        assert flu(range(0)).checkpoint(path, fingerprint="v3").collect() == [0, 1]
+
+    with pytest.raises(TypeError):
+        flu(range(2)).checkpoint(path)
+
+
+def test_resumable(tmp_path):
+    state = str(tmp_path / "job.state")
+
+    gen = flu(range(10)).resumable(state, every=3)
+    assert gen.take(7).collect() == [0, 1, 2, 3, 4, 5, 6]
+    del gen
+    assert flu(range(10)).resumable(state, every=3).collect() == [6, 7, 8, 9]
+    assert not os.path.exists(state)
+
+    assert flu(range(3)).resumable(state, every=1).collect() == [0, 1, 2]
+
+    with pytest.raises(ValueError):
+        flu(range(3)).resumable(state, every=0).collect()
+
+
 def test_sort():
     gen = flu(range(3, 0, -1)).sort()
     assert gen.collect() == [1, 2, 3]
 
 
+def test_merge_sorted():
+    assert flu.merge_sorted([1, 4, 7], [2, 5], [3, 6]).collect() == [1, 2, 3, 4, 5, 6, 7]
+    assert flu([1, 4, 7]).merge_sorted([2, 5], [3, 6]).collect() == [1, 2, 3, 4, 5, 6, 7]
+    assert flu([7, 1]).merge_sorted([5, 2], reverse=True).collect() == [7, 5, 2, 1]
+    assert flu.merge_sorted(["bb", "a"], ["ccc"], key=len, reverse=True).collect() == ["ccc", "bb", "a"]
+    assert flu.merge_sorted().collect() == []
+
+    # Lazy over infinite sources
+    assert flu(count(0, 2)).merge_sorted(count(1, 2)).take(5).collect() == [0, 1, 2, 3, 4]
+
+    # Known to be sorted downstream
+    assert flu([1, 2]).merge_sorted([1, 3]).unique().collect() == [1, 2, 3]
+
+
+def test_interleave():
+    assert flu.interleave([1, 2, 3], ["a", "b"], concurrent=False).collect() == [1, "a", 2, "b", 3]
+    assert flu([1, 2]).interleave([3], concurrent=False).collect() == [1, 3, 2]
+    assert sorted(flu.interleave(range(100), range(100, 200)).collect()) == list(range(200))
+
+    def slow():
+        time.sleep(0.3)
+        yield "slow"
+
+    # A blocking source does not stall the others
+    start = time.monotonic()
+    gen = flu(slow()).interleave(range(3), buffer_size=1)
+    assert gen.take(3).collect() == [0, 1, 2]
+    assert time.monotonic() - start < 0.25
+    assert gen.collect() == ["slow"]
+
+    def failing():
+        raise RuntimeError("source failed")
+        yield
+
+    with pytest.raises(RuntimeError):
+        flu.interleave(failing(), range(3)).collect()
+
+    with pytest.raises(ValueError):
+        flu.interleave([1, 2], [3], buffer_size=0).collect()
+
+
 def test_shuffle():
     original_order = list(range(10000))
     new_order = flu(original_order).shuffle().collect()
@@ -164,6 +317,68 @@ def test_shuffle():
     assert len(new_order) == len(original_order)
     assert sum(new_order) == sum(original_order)
 
+    assert flu(range(100)).shuffle(seed=1).collect() == flu(range(100)).shuffle(seed=1).collect()
+
+    # Without a seed, the global generator is used so random.seed makes the order reproducible
+    random.seed(3)
+    first = flu(range(100)).shuffle().collect()
+    first_buffered = flu(range(100)).shuffle(buffer_size=5).collect()
+    random.seed(3)
+    assert flu(range(100)).shuffle().collect() == first
+    assert flu(range(100)).shuffle(buffer_size=5).collect() == first_buffered
+
+
+def test_shuffle_buffer_size():
+    new_order = flu(range(1000)).shuffle(buffer_size=10, seed=2).collect()
+    assert new_order != list(range(1000))
+    assert sorted(new_order) == list(range(1000))
+    assert all(val - i <= 10 for i, val in enumerate(new_order))
+
+    # Output begins before the iterable is exhausted
+    assert len(flu(count()).shuffle(buffer_size=10).take(5).collect()) == 5
+
+    with pytest.raises(ValueError):
+        flu(range(5)).shuffle(buffer_size=0).collect()
+
+
+def test_sample():
+    assert len(flu(range(1000)).sample(10).collect()) == 10
+    assert sorted(flu(range(5)).sample(10).collect()) == [0, 1, 2, 3, 4]
+    assert flu(range(5)).sample(0).collect() == []
+    assert flu(range(1000)).sample(5, seed=1).collect() == flu(range(1000)).sample(5, seed=1).collect()
+
+    # Uniform
+    counts = [0] * 10
+    for seed in range(2000):
+        for val in flu(range(10)).sample(2, seed=seed):
+            counts[val] += 1
+    assert all(300 < c < 500 for c in counts)
+
+    # Weighted, ignoring non-positive weights
+    counts = [0] * 3
+    for seed in range(2000):
+        for val in flu([0, 1, 2]).sample(1, weight=lambda x: [1, 3, 0][x], seed=seed):
+            counts[val] += 1
+    assert counts[2] == 0
+    assert 1300 < counts[1] < 1700
+
+    with pytest.raises(ValueError):
+        flu(range(5)).sample(-1).collect()
+
+
+def test_sample_fraction():
+    assert flu(range(10)).sample_fraction(0).collect() == []
+    assert flu(range(10)).sample_fraction(1).collect() == list(range(10))
+    res = flu(range(10000)).sample_fraction(0.1, seed=3).collect()
+    assert res == sorted(res)
+    assert 800 < len(res) < 1200
+
+    # Probabilities too small for 1 - p to be represented still skip rather than divide by zero
+    assert flu(range(10)).sample_fraction(1e-300, seed=0).collect() == []
+
+    with pytest.raises(ValueError):
+        flu(range(5)).sample_fraction(2).collect()
+
 
 def test_map():
     gen = flu(range(3)).map(lambda x: x + 2)
@@ -176,6 +391,172 @@ def test_rate_limit():
     assert resA == resB
 
 
+def test_rate_limit_token_bucket():
+    # A burst is served immediately, further elements at the refill rate
+    bucket = TokenBucket(rate=100, burst=5)
+    start = time.monotonic()
+    assert flu(range(5)).rate_limit(bucket).collect() == [0, 1, 2, 3, 4]
+    assert time.monotonic() - start < 0.04
+    assert flu(range(5)).rate_limit(bucket).collect() == [0, 1, 2, 3, 4]
+    assert time.monotonic() - start >= 0.04
+
+    # One bucket shared by pipelines on several threads holds them to a single budget
+    bucket = TokenBucket(rate=200)
+    start = time.monotonic()
+    threads = [threading.Thread(target=lambda: flu(range(10)).rate_limit(bucket).collect()) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert time.monotonic() - start >= 19 / 200
+
+    async def consume():
+        for _ in range(5):
+            await bucket.acquire_async()
+
+    async def consume_concurrently():
+        await asyncio.gather(consume(), consume())
+
+    bucket = TokenBucket(rate=200)
+    start = time.monotonic()
+    asyncio.run(consume_concurrently())
+    assert time.monotonic() - start >= 9 / 200
+
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+    with pytest.raises(ValueError):
+        TokenBucket(rate=1, burst=0)
+
+
+def test_map_cached(monkeypatch):
+    calls = []
+
+    def parse(x):
+        calls.append(x)
+        return str(x)
+
+    assert flu([1, 2, 1, 3, 1, 2]).map_cached(parse, maxsize=2).collect() == ["1", "2", "1", "3", "1", "2"]
+    assert calls == [1, 2, 3, 2]
+
+    # Unhashable elements through a key function, with a shared cache exposing counters
+    cache = LRUCache(8)
+    rows = [{"id": 1}, {"id": 2}, {"id": 1}]
+    assert flu(rows).map_cached(lambda r: r["id"] * 10, key=lambda r: r["id"], cache=cache).collect() == [10, 20, 10]
+    assert flu(rows).map_cached(lambda r: 0, key=lambda r: r["id"], cache=cache).collect() == [10, 20, 10]
+    assert cache.cache_info() == (4, 2, 0, 8, 2)
+    assert len(cache) == 2
+
+    # Entries expire after ttl seconds
+    now = [0.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    calls.clear()
+    gen = flu([1, 1, 1]).map_cached(parse, ttl=5)
+    assert next(gen) == "1"
+    assert next(gen) == "1"
+    now[0] = 10.0
+    assert next(gen) == "1"
+    assert calls == [1, 1]
+
+    # maxsize of 0 disables caching
+    calls.clear()
+    assert flu([1, 1]).map_cached(parse, maxsize=0).collect() == ["1", "1"]
+    assert calls == [1, 1]
+
+
+def test_map_batched():
+    batches = []
+
+    def upper(vals):
+        batches.append(vals)
+        return [v.upper() for v in vals]
+
+    assert flu("abcde").map_batched(upper, batch_size=2).collect() == ["A", "B", "C", "D", "E"]
+    assert batches == [["a", "b"], ["c", "d"], ["e"]]
+
+    assert flu(range(5)).map_batched(lambda xs: [x + 1 for x in xs], 3, max_wait=1).collect() == [1, 2, 3, 4, 5]
+
+    with pytest.raises(ValueError):
+        flu(range(5)).map_batched(lambda xs: xs[:1], batch_size=2).collect()
+
+    with pytest.raises(ValueError):
+        flu(range(5)).map_batched(upper, batch_size=0).collect()
+
+
+def test_map_resilient():
+    # Results keep their order when later calls finish first
+    assert flu([0.05, 0.0, 0.02]).map_resilient(lambda d: time.sleep(d) or d, max_workers=3).collect() == [
+        0.05,
+        0.0,
+        0.02,
+    ]
+
+    # Failed calls are retried with backoff
+    failures = {}
+
+    def flaky(x):
+        failures[x] = failures.get(x, 0) + 1
+        if failures[x] <= 2:
+            raise OSError(x)
+        return x
+
+    assert flu(range(3)).map_resilient(flaky, retries=2, backoff=0.001).collect() == [0, 1, 2]
+    failures.clear()
+    with pytest.raises(OSError):
+        flu(range(3)).map_resilient(flaky, retries=1, backoff=0).collect()
+
+    # Calls exceeding the timeout are retried, then raise
+    calls = []
+
+    def stuck_once(x):
+        calls.append(x)
+        if len(calls) == 1:
+            time.sleep(0.5)
+        return x
+
+    assert flu([1]).map_resilient(stuck_once, timeout=0.05, retries=1, backoff=0).collect() == [1]
+    with pytest.raises(TimeoutError):
+        flu([0.5]).map_resilient(time.sleep, timeout=0.01).collect()
+
+    # A slow call is hedged and the faster duplicate wins
+    calls.clear()
+    start = time.monotonic()
+    assert flu([1, 2]).map_resilient(stuck_once, hedge_after=0.01).collect() == [1, 2]
+    assert time.monotonic() - start < 0.4
+
+    # A hedged call that fails falls back to its duplicate
+    calls.clear()
+
+    def fail_slowly_once(x):
+        calls.append(x)
+        if len(calls) == 1:
+            time.sleep(0.05)
+            raise OSError(x)
+        time.sleep(0.1)
+        return x
+
+    assert flu([1]).map_resilient(fail_slowly_once, hedge_after=0.01).collect() == [1]
+
+    # Percentile hedging starts once enough latencies are observed
+    calls.clear()
+
+    def stuck_late(x):
+        calls.append(x)
+        if len(calls) == 25:
+            time.sleep(0.5)
+        return x
+
+    start = time.monotonic()
+    assert flu(range(30)).map_resilient(stuck_late, hedge_after="p90", max_workers=1).collect() == list(range(30))
+    assert time.monotonic() - start < 0.4
+
+    with pytest.raises(ValueError):
+        flu(range(3)).map_resilient(str, hedge_after="95").collect()
+    with pytest.raises(ValueError):
+        flu(range(3)).map_resilient(str, hedge_after="p100").collect()
+    with pytest.raises(ValueError):
+        flu(range(3)).map_resilient(str, max_workers=0).collect()
+
+
 def test_map_item():
     gen = flu(range(3)).map(lambda x: {"a": x}).map_item("a")
     assert gen.collect() == [0, 1, 2]
@@ -246,6 +627,39 @@ def test_chunk():
     assert gen.collect() == [[0, 1], [2, 3], [4]]
 
 
+def test_chunk_max_wait():
+    assert flu(range(5)).chunk(2, max_wait=1).collect() == [[0, 1], [2, 3], [4]]
+    assert flu([]).chunk(2, max_wait=1).collect() == []
+
+    def slow():
+        yield 0
+        yield 1
+        time.sleep(0.3)
+        yield 2
+
+    # A partial chunk is emitted once max_wait expires
+    start = time.monotonic()
+    gen = flu(slow()).chunk(3, max_wait=0.05)
+    assert next(gen) == [0, 1]
+    assert time.monotonic() - start < 0.25
+    assert gen.collect() == [[2]]
+
+    def failing():
+        yield 0
+        raise RuntimeError("source failed")
+
+    with pytest.raises(RuntimeError):
+        flu(failing()).chunk(3, max_wait=1).collect()
+
+    # A size of 0 yields nothing, as without max_wait
+    assert flu(range(3)).chunk(0, max_wait=0.1).collect() == flu(range(3)).chunk(0).collect() == []
+
+    # The background reader stops when the consumer does
+    gen = flu(count()).chunk(1, max_wait=1)
+    assert next(gen) == [0]
+    del gen
+
+
 def test_next():
     gen = flu(range(5))
     assert next(gen) == 0
@@ -310,6 +724,73 @@ def test_flu():
     assert next(gen) == [0, 267289, 1069156, 2405601, 4276624]
 
 
+def test_rolling():
+    assert flu(range(5)).rolling(3).collect() == [3, 6, 9]
+    assert flu(range(5)).rolling(2, agg="mean").collect() == [0.5, 1.5, 2.5, 3.5]
+    assert flu([3, 1, 4, 1, 5, 9, 2]).rolling(3, agg="min").collect() == [1, 1, 1, 1, 2]
+    assert flu([3, 1, 4, 1, 5, 9, 2]).rolling(3, agg="max").collect() == [4, 4, 5, 9, 9]
+    assert flu([1, None, 2, None, None]).rolling(2, agg="count").collect() == [1, 1, 1, 0]
+    assert flu(range(2)).rolling(3).collect() == []
+
+    # Matches recomputing each window
+    vals = [((i * 7919) % 101) / 7 for i in range(500)]
+    expected = flu(vals).window(10).map(sum).collect()
+    assert flu(vals).rolling(10).collect() == pytest.approx(expected)
+
+    with pytest.raises(ValueError):
+        flu(range(5)).rolling(0).collect()
+
+    with pytest.raises(ValueError):
+        flu(range(5)).rolling(2, agg="median").collect()
+
+
+def test_window_by_time():
+    ts = [1, 3, 7, 12, 14]
+    assert flu(ts).window_by_time(lambda x: x, size=5).collect() == [(0, [1, 3]), (5, [7]), (10, [12, 14])]
+    assert flu(ts).window_by_time(lambda x: x, size=10, slide=5, agg=sum).collect() == [
+        (-5, 4),
+        (0, 11),
+        (5, 33),
+        (10, 26),
+    ]
+
+    # Windows are yielded as soon as the watermark passes them
+    gen = flu(count()).window_by_time(lambda x: x, size=10)
+    assert next(gen) == (0, list(range(10)))
+
+    # Late elements are dropped unless within allowed_lateness
+    records = [(1, "a"), (6, "b"), (4, "c"), (11, "d"), (2, "e")]
+    gen = flu(records).window_by_time(lambda x: x[0], size=5, agg=lambda vals: [v[1] for v in vals])
+    assert gen.collect() == [(0, ["a"]), (5, ["b"]), (10, ["d"])]
+    gen = flu(records).window_by_time(lambda x: x[0], size=5, allowed_lateness=3, agg=lambda vals: [v[1] for v in vals])
+    assert gen.collect() == [(0, ["a", "c"]), (5, ["b"]), (10, ["d"])]
+
+    with pytest.raises(ValueError):
+        flu(ts).window_by_time(lambda x: x, size=0).collect()
+
+
+def test_sessionize():
+    clicks = [("a", 1), ("b", 2), ("a", 3), ("a", 10), ("b", 11), ("a", 12)]
+    res = flu(clicks).sessionize(key=lambda x: x[0], ts_key=lambda x: x[1], gap=5).collect()
+    assert res == [
+        ("b", [("b", 2)]),
+        ("a", [("a", 1), ("a", 3)]),
+        ("b", [("b", 11)]),
+        ("a", [("a", 10), ("a", 12)]),
+    ]
+
+    # Sessions are yielded once they expire
+    gen = flu(count()).map(lambda x: x * 3).sessionize(key=lambda x: x % 2, ts_key=lambda x: x, gap=5, agg=len)
+    assert next(gen) == (0, 1)
+
+    # Out of order elements are reordered within allowed_lateness and dropped otherwise
+    clicks = [("a", 1), ("a", 9), ("a", 4), ("a", 20), ("a", 2)]
+    res = flu(clicks).sessionize(key=lambda x: x[0], ts_key=lambda x: x[1], gap=5, agg=len).collect()
+    assert res == [("a", 1), ("a", 1), ("a", 1)]
+    res = flu(clicks).sessionize(key=lambda x: x[0], ts_key=lambda x: x[1], gap=5, allowed_lateness=5, agg=len)
+    assert res.collect() == [("a", 3), ("a", 1)]
+
+
 def test_flatten():
     nested = [1, [2, (3, [4])], ["rbsd", "abc"], (7,)]
 
@@ -380,6 +861,117 @@ def test_tee():
     assert flu(range(5)).tee().map(sum).sum() == 20
 
 
+def test_tee_max_buffer(tmp_path):
+    # Spill lagging elements to disk
+    gen1, gen2, gen3 = flu(range(100)).tee(3, max_buffer=5, on_full="spill", spill_dir=str(tmp_path))
+    assert gen1.take(60).collect() == list(range(60))
+    assert gen2.take(10).collect() == list(range(10))
+    assert gen1.collect() == list(range(60, 100))
+    assert gen2.collect() == list(range(10, 100))
+    assert gen3.collect() == list(range(100))
+
+    # Block the leading branch until lagging branches on other threads catch up
+    gen1, gen2 = flu(range(1000)).tee(max_buffer=3)
+    results = {}
+    thread = threading.Thread(target=lambda: results.setdefault(1, gen1.collect()))
+    thread.start()
+    results[2] = gen2.collect()
+    thread.join()
+    assert results[1] == results[2] == list(range(1000))
+
+    # Abandoned branches do not hold back the others
+    gen1, gen2 = flu(range(10)).tee(max_buffer=1)
+    assert next(gen2) == 0
+    del gen2
+    assert gen1.collect() == list(range(10))
+
+    # Branches deleted before they were started neither block nor buffer
+    gen1, gen2 = flu(range(10)).tee(max_buffer=2)
+    del gen2
+    thread = threading.Thread(target=lambda: results.setdefault(3, gen1.collect()), daemon=True)
+    thread.start()
+    thread.join(2)
+    assert results[3] == list(range(10))
+
+    gen1, gen2 = flu(range(10)).tee(max_buffer=1, on_full="spill", spill_dir=str(tmp_path / "missing"))
+    del gen2
+    assert gen1.collect() == list(range(10))
+
+    with pytest.raises(ValueError):
+        flu(range(5)).tee(max_buffer=1, on_full="drop")
+
+    with pytest.raises(ValueError):
+        flu(range(5)).tee(max_buffer=0)
+
+
+def test_partition(tmp_path):
+    calls = []
+
+    def is_even(x):
+        calls.append(x)
+        return x % 2 == 0
+
+    evens, odds = flu(range(10)).partition(is_even)
+    assert odds.collect() == [1, 3, 5, 7, 9]
+    assert evens.collect() == [0, 2, 4, 6, 8]
+    assert calls == list(range(10))
+
+    evens, odds = flu(range(100)).partition(
+        lambda x: x % 2 == 0, max_buffer=2, on_full="spill", spill_dir=str(tmp_path)
+    )
+    assert odds.collect() == list(range(1, 100, 2))
+    assert evens.collect() == list(range(0, 100, 2))
+
+    # An error from the iterable is raised in both branches after their buffered elements
+    def failing():
+        yield from [1, 2]
+        raise OSError("source failed")
+
+    evens, odds = flu(failing()).partition(lambda x: x % 2 == 0)
+    with pytest.raises(OSError):
+        evens.collect()
+    assert next(odds) == 1
+    with pytest.raises(OSError):
+        next(odds)
+
+    # An unstarted branch that is deleted does not spill
+    evens, odds = flu(range(10)).partition(
+        lambda x: x % 2 == 0, max_buffer=1, on_full="spill", spill_dir=str(tmp_path / "missing")
+    )
+    del odds
+    assert evens.collect() == [0, 2, 4, 6, 8]
+
+    # Sortedness is preserved
+    small, _ = flu([1, 1, 5, 6]).assume_sorted().partition(lambda x: x < 5)
+    assert small.unique().collect() == [1]
+
+
+def test_split_by():
+    a, b, d = flu(["a1", "b1", "a2", "c1", "b2"]).split_by(key=lambda x: x[0], keys=["a", "b", "d"])
+    assert b.collect() == ["b1", "b2"]
+    assert a.collect() == ["a1", "a2"]
+    assert d.collect() == []
+    assert flu(range(3)).split_by(key=lambda x: x, keys=[]) == ()
+
+    # Repeated keys each get their own iterator
+    a1, a2, b = flu(["a1", "b1", "a2"]).split_by(key=lambda x: x[0], keys=["a", "a", "b"])
+    assert (a1.collect(), a2.collect(), b.collect()) == (["a1", "a2"], ["a1", "a2"], ["b1"])
+
+    # Blocking split consumed from several threads
+    branches = flu(range(300)).split_by(key=lambda x: x % 3, keys=[0, 1, 2], max_buffer=2)
+    results = [None] * 3
+
+    def consume(i):
+        results[i] = branches[i].collect()
+
+    threads = [threading.Thread(target=consume, args=(i,)) for i in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [list(range(i, 300, 3)) for i in range(3)]
+
+
 def test_join_left():
     # Default unpacking
     res = flu(range(6)).join_left(range(0, 6, 2)).collect()
@@ -433,3 +1025,276 @@ def test_join_full():
         )
 
     assert sorted(res, key=sort_key) == sorted(expected, key=sort_key)
+
+
+def test_join_sorted():
+    left = [1, 2, 2, 3, 5]
+    right = [0, 2, 2, 3, 4, 6]
+    assert flu(left).join_left(right, sorted=True).collect() == flu(left).join_left(right).collect()
+    assert flu(left).join_inner(right, sorted=True).collect() == flu(left).join_inner(right).collect()
+    assert flu(left).join_full(right, sorted=True).collect() == [
+        (None, 0),
+        (1, None),
+        (2, 2),
+        (2, 2),
+        (2, 2),
+        (2, 2),
+        (3, 3),
+        (None, 4),
+        (5, None),
+        (None, 6),
+    ]
+    assert flu([]).join_full([1], sorted=True).collect() == [(None, 1)]
+
+    # Custom keys
+    res = flu([{"id": 1}, {"id": 2}]).join_inner(
+        [(2, "b")], key=lambda x: x["id"], other_key=lambda x: x[0], sorted=True
+    )
+    assert res.collect() == [({"id": 2}, (2, "b"))]
+
+    # Chosen automatically for inputs known to be sorted
+    res = flu(left).assume_sorted().join_inner(flu(right).assume_sorted())
+    assert res.collect() == [(2, 2), (2, 2), (2, 2), (2, 2), (3, 3)]
+
+    with pytest.raises(ValueError):
+        flu([2, 1]).join_inner([1, 2], sorted=True).collect()
+
+    with pytest.raises(ValueError):
+        flu([1, 3]).join_left([2, 1, 3], sorted=True).collect()
+
+
+def test_join_spill(tmp_path):
+    left = [x % 50 for x in range(200)]
+    right = [x % 40 for x in range(0, 160, 2)]
+
+    def normalize(rows):
+        return sorted(rows, key=lambda x: (x[0] is None, x[0] or 0, x[1] is None, x[1] or 0))
+
+    for method in ("join_left", "join_inner", "join_full"):
+        expected = getattr(flu(left), method)(right).collect()
+        spilled = getattr(flu(left), method)(right, max_items=5, spill_dir=str(tmp_path)).collect()
+        assert normalize(spilled) == normalize(expected)
+
+    # Skewed keys stop splitting after a bounded depth
+    res = flu([1, 1]).join_inner([1] * 20, max_items=2).collect()
+    assert res == [(1, 1)] * 40
+
+    # Temporary files are removed
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_cache(tmp_path):
+    reads = []
+    cached = flu(range(10)).side_effect(reads.append).cache(max_items=3, spill_dir=str(tmp_path))
+
+    # Lazily filled
+    assert flu(cached).take(2).collect() == [0, 1]
+    assert reads == [0, 1]
+
+    # Replayed any number of times, spilling beyond max_items
+    assert flu(cached).collect() == list(range(10))
+    assert flu(cached).map(lambda x: x * 2).sum() == 90
+    assert reads == list(range(10))
+    assert len(list(tmp_path.iterdir())) == 1
+
+    cached.close()
+    assert list(tmp_path.iterdir()) == []
+
+    # Interleaved and concurrent readers share one read of the source
+    reads.clear()
+    cached = flu(range(1000)).side_effect(reads.append).cache(max_items=10)
+    assert list(zip(cached, cached)) == [(i, i) for i in range(1000)]
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flu(cached).collect())) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [list(range(1000))] * 4
+    assert reads == list(range(1000))
+
+    assert flu(flu([]).cache()).collect() == []
+
+
+def test_to_index(tmp_path):
+    index = flu(range(0, 6, 2)).to_index()
+    assert len(index) == 3
+    assert 2 in index
+    assert index.get(1) == ()
+
+    # Reusable across joins
+    assert flu(range(6)).join_left(index).collect() == [(0, 0), (1, None), (2, 2), (3, None), (4, 4), (5, None)]
+    assert flu(range(6)).join_inner(index).collect() == [(0, 0), (2, 2), (4, 4)]
+    assert flu(range(3)).join_full(index, sorted=True).collect() == [(0, 0), (1, None), (2, 2), (None, 4)]
+
+    # Custom key
+    index = flu([{"id": 1, "v": "a"}, {"id": 1, "v": "b"}]).to_index(key=lambda x: x["id"])
+    assert flu([1]).join_inner(index).map(lambda x: x[1]["v"]).collect() == ["a", "b"]
+
+    # Persisted
+    path = str(tmp_path / "index.pkl")
+    index.save(path)
+    loaded = JoinIndex.load(path)
+    assert loaded.get(1) == index.get(1)
+
+
+def test_filter_in():
+    assert flu(range(6)).filter_in([0, 2, 2, 4]).collect() == [0, 2, 4]
+    assert flu([1, 1, 3]).filter_in([1, 1]).collect() == [1, 1]
+    assert flu(range(6)).filter_in(flu([(2, "a")]).to_index(key=lambda x: x[0])).collect() == [2]
+
+    users = [{"user": "a"}, {"user": "b"}]
+    assert flu(users).filter_in(["b"], key=lambda x: x["user"]).collect() == [{"user": "b"}]
+
+    # Bloom filter never drops matches
+    keys = range(0, 10000, 3)
+    res = flu(range(10000)).filter_in(keys, error_rate=0.01).collect()
+    assert set(keys) <= set(res)
+    assert len(res) < 3334 + 10000 * 0.02
+
+
+def test_filter_not_in():
+    assert flu(range(6)).filter_not_in([0, 2, 2, 4]).collect() == [1, 3, 5]
+    assert flu(range(6)).filter_not_in([("x", 1)], other_key=lambda x: x[1]).collect() == [0, 2, 3, 4, 5]
+
+    # Bloom filter never keeps matches
+    keys = range(0, 10000, 3)
+    res = flu(range(10000)).filter_not_in(keys, error_rate=0.01).collect()
+    assert not set(keys) & set(res)
+    assert len(res) > 6666 - 10000 * 0.02
+
+    for error_rate in [0, 1, 1.5]:
+        with pytest.raises(ValueError):
+            flu(range(5)).filter_not_in(keys, error_rate=error_rate).collect()
+
+
+def test_join_lookup():
+    table = {0: "zero", 2: "two"}
+    calls = []
+
+    def fetch_many(keys):
+        calls.append(keys)
+        return {k: table[k] for k in keys if k in table}
+
+    res = flu([0, 1, 2, 0, 1, 2, 3]).join_lookup(fetch_many, batch_size=3).collect()
+    assert res == [(0, "zero"), (1, None), (2, "two"), (0, "zero"), (1, None), (2, "two"), (3, None)]
+    # Cached keys, including missing ones, are not fetched again
+    assert calls == [[0, 1, 2], [3]]
+
+    # Duplicate keys within a batch are fetched once
+    calls.clear()
+    res = flu(["a", "bb", "cc"]).join_lookup(fetch_many, key=len, cache_size=0).collect()
+    assert res == [("a", None), ("bb", "two"), ("cc", "two")]
+    assert calls == [[1, 2]]
+
+    # Least recently used keys are evicted
+    calls.clear()
+    flu([0, 1, 2, 0]).join_lookup(fetch_many, batch_size=1, cache_size=2).collect()
+    assert calls == [[0], [1], [2], [0]]
+
+    with pytest.raises(ValueError):
+        flu(range(5)).join_lookup(fetch_many, batch_size=0).collect()
+
+
+def test_join_asof():
+    trades = [1, 5, 10]
+    quotes = [0, 4, 6]
+    assert flu(trades).join_asof(quotes, on=lambda t: t).collect() == [(1, 0), (5, 4), (10, 6)]
+    assert flu(trades).join_asof(quotes, on=lambda t: t, direction="forward").collect() == [
+        (1, 4),
+        (5, 6),
+        (10, None),
+    ]
+    assert flu(trades).join_asof(quotes, on=lambda t: t, direction="nearest").collect() == [
+        (1, 0),
+        (5, 4),
+        (10, 6),
+    ]
+    assert flu(trades).join_asof(quotes, on=lambda t: t, tolerance=1).collect() == [(1, 0), (5, 4), (10, None)]
+    assert flu([4]).join_asof(quotes, on=lambda t: t, direction="forward").collect() == [(4, 4)]
+    assert flu([1]).join_asof([5], on=lambda t: t, direction="forward", tolerance=2).collect() == [(1, None)]
+
+    # Matching by key
+    trades = [(1, "a"), (2, "b"), (3, "a")]
+    quotes = [(0, "b", 10), (1, "a", 20), (4, "b", 30)]
+    res = flu(trades).join_asof(
+        quotes, on=lambda t: t[0], other_on=lambda q: q[0], by=lambda t: t[1], other_by=lambda q: q[1]
+    )
+    assert res.map(lambda x: x[1] and x[1][2]).collect() == [20, 10, 20]
+
+    res = flu(trades).join_asof(
+        quotes,
+        on=lambda t: t[0],
+        other_on=lambda q: q[0],
+        by=lambda t: t[1],
+        other_by=lambda q: q[1],
+        direction="forward",
+        tolerance=2,
+    )
+    assert res.map(lambda x: x[1] and x[1][2]).collect() == [20, 30, None]
+
+    # Ties in other: forward matches the first entry at the element's time, backward the last
+    quotes = [(2, "w"), (4, "x"), (4, "y"), (6, "z")]
+    assert flu([4]).join_asof(quotes, on=lambda t: t, other_on=lambda q: q[0], direction="forward").collect() == [
+        (4, (4, "x"))
+    ]
+    assert flu([4]).join_asof(quotes, on=lambda t: t, other_on=lambda q: q[0]).collect() == [(4, (4, "y"))]
+
+    # Many interleaved keys: forward lookups only read ahead to the next entry of their own key
+    pulled = []
+
+    def quotes_by_key():
+        for t in range(10_000):
+            pulled.append(t)
+            yield (t, t % 100)
+
+    res = flu((t, t % 100) for t in range(0, 9_000, 3)).join_asof(
+        quotes_by_key(), on=lambda t: t[0], by=lambda t: t[1], direction="nearest"
+    )
+    for trade, quote in res:
+        assert quote == (trade[0], trade[1])
+        assert len(pulled) <= trade[0] + 2
+    assert len(pulled) < 9_000
+
+    # Keys that never match are not rescanned for every element
+    start = time.monotonic()
+    res = flu((t, "a") for t in range(2_000)).join_asof(
+        [(t, "b") for t in range(20_000)], on=lambda t: t[0], by=lambda t: t[1], direction="forward"
+    )
+    assert res.map(lambda x: x[1]).collect() == [None] * 2_000
+    assert time.monotonic() - start < 1
+
+    with pytest.raises(ValueError):
+        flu([1]).join_asof([0], on=lambda t: t, direction="sideways").collect()
+
+    with pytest.raises(ValueError):
+        flu([2, 1]).join_asof([0], on=lambda t: t).collect()
+
+    with pytest.raises(ValueError):
+        flu([5]).join_asof([2, 1], on=lambda t: t).collect()
+
+
+def test_join_interval():
+    shifts = [(0, 8), (8, 16), (16, 24)]
+    events = [(2, 3), (7, 9), (10, 30), (20, 21)]
+    res = flu(shifts).join_interval(events, start=lambda x: x[0], end=lambda x: x[1]).collect()
+    assert res == [
+        ((0, 8), (2, 3)),
+        ((0, 8), (7, 9)),
+        ((8, 16), (7, 9)),
+        ((8, 16), (10, 30)),
+        ((16, 24), (10, 30)),
+        ((16, 24), (20, 21)),
+    ]
+
+    # Points within intervals
+    res = flu(shifts).join_interval(
+        [1, 9, 12], start=lambda x: x[0], end=lambda x: x[1], other_start=lambda x: x, other_end=lambda x: x + 1
+    )
+    assert res.collect() == [((0, 8), 1), ((8, 16), 9), ((8, 16), 12)]
+
+    with pytest.raises(ValueError):
+        flu([(2, 3), (0, 1)]).join_interval([], start=lambda x: x[0], end=lambda x: x[1]).collect()
+
+    with pytest.raises(ValueError):
+        flu([(0, 10)]).join_interval([(5, 6), (1, 2)], start=lambda x: x[0], end=lambda x: x[1]).collect()